@@ -0,0 +1,540 @@
+import numpy as np
+from constants import *
+from mazedata import MazeData
+from mazecompiler import getCompiledMaze
+from run import FRAMERATE
+from modes import PHASETIMES
+
+# Entity indices in the per-entity arrays (and access array)
+PACMANINDEX = 0
+BLINKYINDEX = 1
+PINKYINDEX = 2
+INKYINDEX = 3
+CLYDEINDEX = 4
+ENTITYNAMES = (PACMAN, BLINKY, PINKY, INKY, CLYDE)
+NUMGHOSTS = 4
+# Rows of the ghosts in the per-entity arrays, in the order of GhostGroup
+GHOSTROWS = slice(BLINKYINDEX, CLYDEINDEX + 1)
+GHOSTINDICES = np.arange(NUMGHOSTS)
+
+# Direction constants are kept as is (so reversing is negation), and are
+# mapped to a slot (UP, DOWN, LEFT, RIGHT) and unit vector by indexing with
+# direction + 2
+SLOTDIRECTIONS = np.array([UP, DOWN, LEFT, RIGHT])
+DIRECTIONSLOT = np.array([3, 1, -1, 0, 2])
+DIRECTIONX = np.array([1.0, 0.0, 0.0, 0.0, -1.0])
+DIRECTIONY = np.array([0.0, 1.0, 0.0, -1.0, 0.0])
+SLOTX = DIRECTIONX[SLOTDIRECTIONS + 2]
+SLOTY = DIRECTIONY[SLOTDIRECTIONS + 2]
+
+
+class BatchGame(object):
+    """
+    N independent headless games advanced in lockstep, with the state of all
+    games stored as NumPy arrays (structure-of-arrays) and every rule of a
+    GameController frame applied to all games at once. Per-entity arrays are
+    indexed [entity, game] and per-ghost arrays [ghost, game], so the four
+    ghosts of every game are updated by the same operations.
+
+    A frame applies the rules of GameController.update in the same order,
+    followed by the death and end of game handling of PacmanEnvironment.step.
+    Entities are moved by their velocity and tested for overshooting their
+    target by squared distance, rather than by their progress along the edge
+    as in Entity, which ends on the same positions. Given the same learnt
+    directions, a game in the batch follows the trajectory of a
+    GameController until a frightened ghost first chooses a random
+    direction, which the batch draws from its NumPy generator (seeded by
+    seed) and Entity.randomDirection from the random module.
+    test_batchgame.py checks this frame by frame, with the GameController
+    given the random numbers of the batch.
+
+    Games that lose a life are reset with resetLevel semantics, and games that
+    end (won or lost) are restarted immediately, after their final statistics
+    have been copied to the final* arrays.
+    """
+
+    def __init__(self, numGames, level=0, seed=None):
+        self.numGames = numGames
+        self.dt = 1 / FRAMERATE
+        self.rng = np.random.default_rng(seed)
+        self.games = np.arange(numGames)
+
+        mazedata = MazeData()
+        mazedata.loadMaze(level)
+        self.level = level
+        self.setupMaze(getCompiledMaze(mazedata.obj), mazedata.obj)
+        self.allocate()
+        self.resetEpisodes(np.ones(numGames, dtype=bool))
+
+    def setupMaze(self, maze, mazeobj):
+        self.maze = maze
+        keys = np.array(maze.nodeKeys, dtype=float)
+        self.nodeX = keys[:, 0]
+        self.nodeY = keys[:, 1]
+        self.neighbors = np.array(maze.neighbors, dtype=np.int64)
+        self.numNodes = len(maze.nodeKeys)
+
+        nodeIds = {key: i for i, key in enumerate(maze.nodeKeys)}
+        def nodeFromTiles(col, row):
+            return nodeIds[(col * TILEWIDTH, row * TILEHEIGHT)]
+
+        # accessTemplate[entity, node, slot] is True if entity may leave node in slot direction
+        self.accessTemplate = np.zeros((len(ENTITYNAMES), self.numNodes, 4), dtype=bool)
+        for i, access in enumerate(maze.access):
+            for slot, names in enumerate(access):
+                for e, name in enumerate(ENTITYNAMES):
+                    self.accessTemplate[e, i, slot] = name in names
+
+        self.pacmanStart = nodeFromTiles(*mazeobj.pacmanStart)
+        self.pacmanStartTarget = self.neighbors[self.pacmanStart, DIRECTIONSLOT[LEFT + 2]]
+        self.pacmanStartX = (self.nodeX[self.pacmanStart] + self.nodeX[self.pacmanStartTarget]) / 2.0
+        self.pacmanStartY = (self.nodeY[self.pacmanStart] + self.nodeY[self.pacmanStartTarget]) / 2.0
+
+        self.ghostStart = np.array([nodeFromTiles(*mazeobj.addOffset(2, 0)), nodeFromTiles(*mazeobj.addOffset(2, 3)),
+                                    nodeFromTiles(*mazeobj.addOffset(0, 3)), nodeFromTiles(*mazeobj.addOffset(4, 3))])
+        self.spawnNode = nodeFromTiles(*mazeobj.addOffset(2, 3))
+        self.homeNode = 0 # Ghosts are constructed on NodeGroup.getStartTempNode()
+        self.homekey = nodeIds[maze.homekey]
+        self.scatterX = np.array([0.0, TILEWIDTH*NCOLS, TILEWIDTH*NCOLS, 0.0])
+        self.scatterY = np.array([0.0, 0.0, TILEHEIGHT*NROWS, TILEHEIGHT*NROWS])
+
+        fruitNode = nodeFromTiles(9, 20)
+        fruitTarget = self.neighbors[fruitNode, DIRECTIONSLOT[RIGHT + 2]]
+        self.fruitX = (self.nodeX[fruitNode] + self.nodeX[fruitTarget]) / 2.0
+        self.fruitY = (self.nodeY[fruitNode] + self.nodeY[fruitTarget]) / 2.0
+        self.fruitPoints = 100 + self.level*20
+
+        self.numPellets = len(maze.pellets)
+        self.pelletX = np.array([col * TILEWIDTH for row, col, name in maze.pellets], dtype=float)
+        self.pelletY = np.array([row * TILEHEIGHT for row, col, name in maze.pellets], dtype=float)
+        self.pelletPower = np.array([name == POWERPELLET for row, col, name in maze.pellets])
+        self.pelletPoints = np.where(self.pelletPower, 50, 10)
+        self.pelletGrid = np.full((NROWS, NCOLS), -1, dtype=np.int64)
+        for i, (row, col, name) in enumerate(maze.pellets):
+            self.pelletGrid[row, col] = i
+
+    def allocate(self):
+        n = self.numGames
+        numEntities = len(ENTITYNAMES)
+        self.positionX = np.zeros((numEntities, n))
+        self.positionY = np.zeros((numEntities, n))
+        self.node = np.zeros((numEntities, n), dtype=np.int64)
+        self.target = np.zeros((numEntities, n), dtype=np.int64)
+        self.direction = np.zeros((numEntities, n), dtype=np.int64)
+        self.speed = np.zeros((numEntities, n))
+        self.access = np.zeros((numEntities, n, self.numNodes, 4), dtype=bool)
+
+        self.alive = np.zeros(n, dtype=bool)
+        self.isAtNode = np.zeros(n, dtype=bool)
+        self.learntDirection = np.zeros(n, dtype=np.int64)
+
+        self.mode = np.zeros((NUMGHOSTS, n), dtype=np.int64)
+        self.modeTimer = np.zeros((NUMGHOSTS, n))
+        self.modeTime = np.zeros((NUMGHOSTS, n))
+        self.mainMode = np.zeros(n, dtype=np.int64)
+        self.mainTimer = np.zeros(n)
+        self.mainTime = np.zeros(n)
+        self.randomDirection = np.zeros((NUMGHOSTS, n), dtype=bool)
+        self.points = np.zeros((NUMGHOSTS, n), dtype=np.int64)
+        self.goalX = np.zeros((NUMGHOSTS, n))
+        self.goalY = np.zeros((NUMGHOSTS, n))
+
+        # Per-ghost buffers which every step reuses instead of allocating them
+        self.freightMask = np.zeros((NUMGHOSTS, n), dtype=bool)
+        self.endFreightMask = np.zeros((NUMGHOSTS, n), dtype=bool)
+        self.ghostMask = np.zeros((NUMGHOSTS, n), dtype=bool)
+        self.ghostMask2 = np.zeros((NUMGHOSTS, n), dtype=bool)
+        self.chaseX = np.zeros((NUMGHOSTS, n))
+        self.chaseY = np.zeros((NUMGHOSTS, n))
+
+        self.remaining = np.zeros((n, self.numPellets), dtype=bool)
+        self.numRemaining = np.zeros(n, dtype=np.int64)
+        self.numEaten = np.zeros(n, dtype=np.int64)
+        self.fruitActive = np.zeros(n, dtype=bool)
+        self.fruitTimer = np.zeros(n)
+        self.fruitDestroy = np.zeros(n, dtype=bool)
+
+        self.score = np.zeros(n, dtype=np.int64)
+        self.lives = np.zeros(n, dtype=np.int64)
+        self.ghostsKilled = np.zeros(n, dtype=np.int64)
+        self.levelWon = np.zeros(n, dtype=bool)
+        self.levelLost = np.zeros(n, dtype=bool)
+
+        self.numFrames = np.zeros(n, dtype=np.int64)
+        self.finalScore = np.zeros(n, dtype=np.int64)
+        self.finalLives = np.zeros(n, dtype=np.int64)
+        self.finalNumEaten = np.zeros(n, dtype=np.int64)
+        self.finalGhostsKilled = np.zeros(n, dtype=np.int64)
+        self.finalLevelWon = np.zeros(n, dtype=bool)
+        self.finalNumFrames = np.zeros(n, dtype=np.int64)
+
+    # Same as GameController.resetEpisode for the masked games
+    def resetEpisodes(self, mask):
+        self.resetLevels(mask)
+        self.speed[:, mask] = 100 * TILEWIDTH / 16
+        self.access[:, mask] = self.accessTemplate[:, None]
+        self.mode[:, mask] = SCATTER
+        self.modeTimer[:, mask] = 0
+        self.modeTime[:, mask] = np.nan
+        self.mainMode[mask] = SCATTER
+        self.mainTimer[mask] = 0
+        self.mainTime[mask] = PHASETIMES[SCATTER]
+        self.goalX[:, mask] = 0
+        self.goalY[:, mask] = 0
+        self.remaining[mask] = True
+        self.numRemaining[mask] = self.numPellets
+        self.numEaten[mask] = 0
+        self.score[mask] = 0
+        self.lives[mask] = 5
+        self.ghostsKilled[mask] = 0
+        self.levelWon[mask] = False
+        self.levelLost[mask] = False
+        self.numFrames[mask] = 0
+
+    # Same as GameController.resetLevel for the masked games
+    def resetLevels(self, mask):
+        self.node[PACMANINDEX, mask] = self.pacmanStart
+        self.target[PACMANINDEX, mask] = self.pacmanStartTarget
+        self.positionX[PACMANINDEX, mask] = self.pacmanStartX
+        self.positionY[PACMANINDEX, mask] = self.pacmanStartY
+        self.direction[PACMANINDEX, mask] = LEFT
+        self.alive[mask] = True
+        self.isAtNode[mask] = False
+        self.learntDirection[mask] = STOP
+
+        self.node[GHOSTROWS, mask] = self.ghostStart[:, None]
+        self.target[GHOSTROWS, mask] = self.ghostStart[:, None]
+        self.positionX[GHOSTROWS, mask] = self.nodeX[self.ghostStart][:, None]
+        self.positionY[GHOSTROWS, mask] = self.nodeY[self.ghostStart][:, None]
+        self.direction[GHOSTROWS, mask] = STOP
+        self.points[:, mask] = 200
+        self.randomDirection[:, mask] = False
+        self.fruitActive[mask] = False
+
+    def getValidDirections(self):
+        """
+        Returns a [numGames, 4] mask of the directions (UP, DOWN, LEFT, RIGHT)
+        in Pacman.getValidDirections
+        """
+        direction = self.direction[PACMANINDEX]
+        atNode = self.validSlotsFromNodes(self.node[PACMANINDEX], PACMANINDEX)
+        onEdge = (direction != STOP)[:, None] & (
+            (SLOTDIRECTIONS[None, :] == direction[:, None]) | (SLOTDIRECTIONS[None, :] == -direction[:, None]))
+        return self.alive[:, None] & np.where(self.isAtNode[:, None], atNode, onEdge)
+
+    def step(self, learntDirections):
+        """
+        Sets the learnt direction of every Pacman and advances all games by one
+        frame. Returns the score gained, whether Pacman died and whether the
+        game ended (and was restarted), each as a [numGames] array.
+        """
+        self.learntDirection[:] = learntDirections
+        scoreBefore = self.score.copy()
+
+        self.updatePacman()
+        self.updateMainMode()
+        self.updateGhosts()
+        active = self.fruitActive
+        self.fruitTimer[active] += self.dt
+        self.fruitDestroy = active & (self.fruitTimer >= 5)
+        self.checkPelletEvents()
+        self.checkGhostEvents()
+        self.checkFruitEvents()
+        self.numFrames += 1
+
+        scoreGained = self.score - scoreBefore
+        died = ~self.alive
+        self.resetLevels(died & ~self.levelLost)
+        done = self.levelWon | self.levelLost
+        if done.any():
+            self.finalScore[done] = self.score[done]
+            self.finalLives[done] = self.lives[done]
+            self.finalNumEaten[done] = self.numEaten[done]
+            self.finalGhostsKilled[done] = self.ghostsKilled[done]
+            self.finalLevelWon[done] = self.levelWon[done]
+            self.finalNumFrames[done] = self.numFrames[done]
+            self.resetEpisodes(done)
+        return scoreGained, died, done
+
+    def validSlotsFromNodes(self, nodes, entity):
+        return self.access[entity, self.games, nodes] & (self.neighbors[nodes, :4] >= 0)
+
+    # Entities is an entity index or GHOSTROWS
+    def overshotTarget(self, entities):
+        node = self.node[entities]
+        target = self.target[entities]
+        vec1x = self.nodeX[target] - self.nodeX[node]
+        vec1y = self.nodeY[target] - self.nodeY[node]
+        vec2x = self.positionX[entities] - self.nodeX[node]
+        vec2y = self.positionY[entities] - self.nodeY[node]
+        return vec2x**2 + vec2y**2 >= vec1x**2 + vec1y**2
+
+    def move(self, entities):
+        direction = self.direction[entities] + 2
+        speed = self.speed[entities]
+        velocityX = DIRECTIONX[direction] * speed * self.dt
+        velocityY = DIRECTIONY[direction] * speed * self.dt
+        self.positionX[entities] += velocityX
+        self.positionY[entities] += velocityY
+        return (velocityX != 0) | (velocityY != 0)
+
+    def updatePacman(self):
+        e = PACMANINDEX
+        node = self.node[e].copy()
+        target = self.target[e].copy()
+        direction = self.direction[e].copy()
+        learnt = self.learntDirection
+
+        learntSlot = DIRECTIONSLOT[learnt + 2]
+        valid = self.getValidDirections()
+        learntValid = (learntSlot >= 0) & valid[self.games, learntSlot]
+        desired = np.where(learntValid, learnt, direction)
+        change = desired != direction
+        atNode = change & self.isAtNode
+        reverse = change & ~self.isAtNode & (desired == -direction)
+        newTarget = np.where(atNode, self.neighbors[node, DIRECTIONSLOT[desired + 2]], target)
+        self.target[e] = np.where(reverse, node, newTarget)
+        self.node[e] = np.where(reverse, target, node)
+        self.direction[e] = desired
+
+        moving = self.move(e)
+        self.isAtNode &= ~moving
+
+        overshot = self.overshotTarget(e)
+        if overshot.any():
+            node = np.where(overshot, self.target[e], self.node[e])
+            portal = self.neighbors[node, 4]
+            node = np.where(overshot & (portal >= 0), portal, node)
+            direction = self.direction[e]
+            slot = DIRECTIONSLOT[direction + 2]
+            canContinue = (slot >= 0) & self.validSlotsFromNodes(node, e)[self.games, slot]
+            continueTarget = np.where(canContinue, self.neighbors[node, slot], node)
+            self.node[e] = node
+            self.target[e] = np.where(overshot, continueTarget, self.target[e])
+            self.direction[e] = np.where(overshot & ~canContinue, STOP, direction)
+            self.positionX[e, overshot] = self.nodeX[node[overshot]]
+            self.positionY[e, overshot] = self.nodeY[node[overshot]]
+            self.isAtNode |= overshot
+
+    # GhostGroup.update after the MainMode, for all ghosts at once. Where a
+    # ghost depends on one updated before it in GhostGroup (Inky's goal is
+    # taken from Blinky's position after Blinky has moved) the ghosts are
+    # first moved, and those that overshot their target placed on their new
+    # node, which does not depend on their goal. The goals are then set from
+    # these positions, except for Clyde's distance to Pacman which is taken
+    # before Clyde moves, and the new directions are chosen from the goals.
+    def updateGhosts(self):
+        self.updateModes()
+        clydeX = self.positionX[CLYDEINDEX]
+        clydeY = self.positionY[CLYDEINDEX]
+        clydeNear = (self.positionX[PACMANINDEX] - clydeX)**2 + (self.positionY[PACMANINDEX] - clydeY)**2 <= (TILEWIDTH * 8)**2
+
+        self.move(GHOSTROWS)
+        ghost, games = np.nonzero(self.overshotTarget(GHOSTROWS))
+        e = ghost + 1
+        node = self.target[e, games]
+        portal = self.neighbors[node, 4]
+        newNode = np.where(portal >= 0, portal, node)
+        self.positionX[e, games] = self.nodeX[newNode]
+        self.positionY[e, games] = self.nodeY[newNode]
+        self.updateGoals(clydeNear)
+        if len(games) == 0:
+            return
+
+        direction = self.direction[e, games]
+        reverseSlot = DIRECTIONSLOT[-direction + 2]
+        valid = self.access[e, games, node] & (self.neighbors[node, :4] >= 0)
+        valid[np.arange(len(games)), reverseSlot] &= reverseSlot < 0
+        numValid = valid.sum(axis=1)
+
+        # Entity.goalDirection
+        distX = (self.nodeX[node][:, None] + SLOTX[None, :] * TILEWIDTH) - self.goalX[ghost, games][:, None]
+        distY = (self.nodeY[node][:, None] + SLOTY[None, :] * TILEHEIGHT) - self.goalY[ghost, games][:, None]
+        distances = np.where(valid, distX**2 + distY**2, np.inf)
+        chosenSlot = np.argmin(distances, axis=1)
+
+        # Entity.randomDirection, which also draws when only the reverse
+        # direction is left. The draws are in the order of the ghosts and then
+        # the games, like the ghosts of a GhostGroup.
+        isRandom = self.randomDirection[ghost, games]
+        if isRandom.any():
+            choice = (self.rng.random(np.count_nonzero(isRandom)) * np.maximum(numValid[isRandom], 1)).astype(np.int64)
+            cumulative = np.cumsum(valid[isRandom], axis=1)
+            chosenSlot[isRandom] = np.argmax(cumulative > choice[:, None], axis=1)
+
+        chosen = np.where(numValid > 0, SLOTDIRECTIONS[chosenSlot], -direction)
+
+        newTarget = self.getNewTargets(games, newNode, chosen, e)
+        keep = newTarget == newNode
+        oldTarget = self.getNewTargets(games, newNode, direction, e)
+        self.direction[e, games] = np.where(keep, direction, chosen)
+        self.target[e, games] = np.where(keep, oldTarget, newTarget)
+        self.node[e, games] = newNode
+
+    # Entity.getNewTarget
+    def getNewTargets(self, games, nodes, directions, entities):
+        slot = DIRECTIONSLOT[directions + 2]
+        neighbor = self.neighbors[nodes, slot]
+        valid = (slot >= 0) & self.access[entities, games, nodes, slot] & (neighbor >= 0)
+        return np.where(valid, neighbor, nodes)
+
+    # MainMode.update, once per frame for all ghosts as in GhostGroup.update
+    def updateMainMode(self):
+        self.mainTimer += self.dt
+        flip = self.mainTimer >= self.mainTime
+        if flip.any():
+            toChase = flip & (self.mainMode == SCATTER)
+            toScatter = flip & (self.mainMode == CHASE)
+            self.mainMode[toChase] = CHASE
+            self.mainTime[toChase] = PHASETIMES[CHASE]
+            self.mainMode[toScatter] = SCATTER
+            self.mainTime[toScatter] = PHASETIMES[SCATTER]
+            self.mainTimer[flip] = 0
+
+    # ModeController.update of every ghost
+    def updateModes(self):
+        mode = self.mode
+        freight = np.equal(mode, FREIGHT, out=self.freightMask)
+        np.add(self.modeTimer, self.dt, out=self.modeTimer, where=freight)
+        endFreight = np.greater_equal(self.modeTimer, self.modeTime, out=self.endFreightMask)
+        endFreight &= freight
+        if endFreight.any():
+            self.modeTime[endFreight] = np.nan
+            self.normalMode(endFreight)
+        update = np.equal(mode, SCATTER, out=self.ghostMask)
+        update |= np.equal(mode, CHASE, out=self.ghostMask2)
+        update |= endFreight
+        np.copyto(mode, self.mainMode, where=update)
+
+        spawned = np.equal(mode, SPAWN, out=self.ghostMask)
+        spawned &= np.equal(self.node[GHOSTROWS], self.spawnNode, out=self.ghostMask2)
+        if spawned.any():
+            self.normalMode(spawned)
+            np.copyto(mode, self.mainMode, where=spawned)
+
+    # Ghost.normalMode of the masked [ghost, game]s
+    def normalMode(self, mask):
+        self.speed[GHOSTROWS][mask] = 100 * TILEWIDTH / 16
+        self.randomDirection[mask] = False
+        self.access[GHOSTROWS, :, self.homeNode, DIRECTIONSLOT[DOWN + 2]][mask] = False
+
+    # Ghost.scatter and the chase methods of the Ghost subclasses
+    def updateGoals(self, clydeNear):
+        mode = self.mode
+        scatter = np.equal(mode, SCATTER, out=self.ghostMask)
+        np.copyto(self.goalX, self.scatterX[:, None], where=scatter)
+        np.copyto(self.goalY, self.scatterY[:, None], where=scatter)
+        chase = np.equal(mode, CHASE, out=self.ghostMask)
+        if not chase.any():
+            return
+
+        pacmanX = self.positionX[PACMANINDEX]
+        pacmanY = self.positionY[PACMANINDEX]
+        pacmanDirection = self.direction[PACMANINDEX] + 2
+        aheadX = pacmanX + DIRECTIONX[pacmanDirection] * TILEWIDTH * 4
+        aheadY = pacmanY + DIRECTIONY[pacmanDirection] * TILEWIDTH * 4
+        blinkyX = self.positionX[BLINKYINDEX]
+        blinkyY = self.positionY[BLINKYINDEX]
+        vec1X = pacmanX + DIRECTIONX[pacmanDirection] * TILEWIDTH * 2
+        vec1Y = pacmanY + DIRECTIONY[pacmanDirection] * TILEWIDTH * 2
+
+        chaseX = self.chaseX
+        chaseY = self.chaseY
+        chaseX[0] = pacmanX
+        chaseY[0] = pacmanY
+        chaseX[1] = aheadX
+        chaseY[1] = aheadY
+        chaseX[2] = blinkyX + (vec1X - blinkyX) * 2
+        chaseY[2] = blinkyY + (vec1Y - blinkyY) * 2
+        chaseX[3] = np.where(clydeNear, self.scatterX[3], aheadX)
+        chaseY[3] = np.where(clydeNear, self.scatterY[3], aheadY)
+        np.copyto(self.goalX, chaseX, where=chase)
+        np.copyto(self.goalY, chaseY, where=chase)
+
+    def collidesWithPacman(self, x, y, radius):
+        dx = self.positionX[PACMANINDEX] - x
+        dy = self.positionY[PACMANINDEX] - y
+        return dx**2 + dy**2 <= (5 + radius)**2
+
+    def checkPelletEvents(self):
+        # Pellets are a tile apart, so only the pellet on the nearest tile can collide
+        col = np.floor(self.positionX[PACMANINDEX] / TILEWIDTH + 0.5).astype(np.int64)
+        row = np.floor(self.positionY[PACMANINDEX] / TILEHEIGHT + 0.5).astype(np.int64)
+        inside = (col >= 0) & (col < NCOLS) & (row >= 0) & (row < NROWS)
+        pellet = np.where(inside, self.pelletGrid[row.clip(0, NROWS-1), col.clip(0, NCOLS-1)], -1)
+        candidate = (pellet >= 0) & self.remaining[self.games, pellet]
+        eaten = candidate & self.collidesWithPacman(self.pelletX[pellet], self.pelletY[pellet], 2 * TILEWIDTH / 16)
+        if not eaten.any():
+            return
+
+        pellet = pellet[eaten]
+        self.numEaten[eaten] += 1
+        self.score[eaten] += self.pelletPoints[pellet]
+        released = eaten & (self.numEaten == 30)
+        self.access[INKYINDEX, released, self.ghostStart[2], DIRECTIONSLOT[RIGHT + 2]] = True
+        released = eaten & (self.numEaten == 70)
+        self.access[CLYDEINDEX, released, self.ghostStart[3], DIRECTIONSLOT[LEFT + 2]] = True
+        self.remaining[eaten, pellet] = False
+        self.numRemaining[eaten] -= 1
+
+        power = np.zeros(self.numGames, dtype=bool)
+        power[eaten] = self.pelletPower[pellet]
+        if power.any():
+            self.startFreight(power)
+        self.levelWon |= eaten & (self.numRemaining == 0)
+
+    # GhostGroup.startFreight
+    def startFreight(self, mask):
+        mode = self.mode
+        normal = ((mode == SCATTER) | (mode == CHASE)) & mask
+        self.modeTimer[normal | ((mode == FREIGHT) & mask)] = 0
+        self.modeTime[normal] = 7
+        mode[normal] = FREIGHT
+
+        freight = (mode == FREIGHT) & mask
+        self.speed[GHOSTROWS][freight] = 50 * TILEWIDTH / 16
+        self.randomDirection[freight] = True
+        self.points[:, mask] = 200
+
+    # The ghosts are checked in the order of GhostGroup, and the first one
+    # killing Pacman ends the check, so only the frightened ghosts before it
+    # are eaten
+    def checkGhostEvents(self):
+        collides = self.collidesWithPacman(self.positionX[GHOSTROWS], self.positionY[GHOSTROWS], 5)
+        if not collides.any():
+            return
+        mode = self.mode
+
+        kills = collides & (mode != FREIGHT) & (mode != SPAWN) & self.alive
+        killed = kills.any(axis=0)
+        firstKill = np.where(killed, kills.argmax(axis=0), NUMGHOSTS)
+        eaten = collides & (mode == FREIGHT) & (GHOSTINDICES[:, None] < firstKill)
+        if eaten.any():
+            # The ghosts of a game always have the same points, which double
+            # with every ghost eaten
+            numEaten = eaten.sum(axis=0)
+            self.score += self.points[0] * ((1 << numEaten) - 1)
+            self.ghostsKilled += numEaten
+            self.points *= 1 << numEaten
+            mode[eaten] = SPAWN
+            self.speed[GHOSTROWS][eaten] = 150 * TILEWIDTH / 16
+            self.randomDirection[eaten] = False
+            self.goalX[eaten] = self.nodeX[self.spawnNode]
+            self.goalY[eaten] = self.nodeY[self.spawnNode]
+            self.access[GHOSTROWS, :, self.homekey, DIRECTIONSLOT[DOWN + 2]][eaten] = True
+
+        if killed.any():
+            self.lives[killed] -= 1
+            self.alive[killed] = False
+            self.direction[PACMANINDEX, killed] = STOP
+            self.levelLost |= killed & (self.lives <= 0)
+
+    def checkFruitEvents(self):
+        spawn = ((self.numEaten == 50) | (self.numEaten == 140)) & ~self.fruitActive
+        self.fruitActive |= spawn
+        self.fruitTimer[spawn] = 0
+        self.fruitDestroy &= ~spawn
+
+        eaten = self.fruitActive & self.collidesWithPacman(self.fruitX, self.fruitY, 5)
+        self.score[eaten] += self.fruitPoints
+        self.fruitActive &= ~(eaten | self.fruitDestroy)
@@ -0,0 +1,71 @@
+import queue
+import threading
+from policyfile import appendDeltas, removeDeltas, writePolicy
+from qtable import DenseQTable
+
+
+class PolicyCheckpointer(object):
+    """
+    Writes checkpoints of a policy on a background thread, from a snapshot
+    of the Q-table taken when the checkpoint is made, so training goes on
+    while they are written. A full checkpoint writes the whole binary policy
+    (see policyfile.writePolicy). With numDeltas > 0, up to numDeltas
+    checkpoints in a row after a full one only append the Q-values changed
+    since the previous checkpoint to the delta log of the policy, which
+    Player.loadPolicy applies on top of it.
+
+    Checkpoints are written in the order they are made. An error on the
+    background thread is raised by the next call of checkpoint or wait.
+    """
+    def __init__(self, numDeltas=0):
+        self.numDeltas = numDeltas
+        self.numDeltasSinceFull = None
+        self.jobs = queue.Queue()
+        self.thread = None
+        self.error = None
+
+    def checkpoint(self, file, table, numIterations, hyperparameters):
+        self.raiseError()
+        if self.numDeltasSinceFull is None or self.numDeltasSinceFull >= self.numDeltas:
+            table.takeChanges()
+            self.numDeltasSinceFull = 0
+            self.submit(self.writeFull, file, table.copy(), numIterations, hyperparameters)
+        else:
+            self.numDeltasSinceFull += 1
+            self.submit(appendDeltas, file, numIterations, table.takeChanges())
+
+    def writeFull(self, file, table, numIterations, hyperparameters):
+        if not isinstance(table, DenseQTable):
+            table = DenseQTable(table.toCounter())
+        writePolicy(file, table, numIterations, *hyperparameters)
+        removeDeltas(file)
+
+    # Makes the next checkpoint a full one
+    def reset(self):
+        self.numDeltasSinceFull = None
+
+    def submit(self, function, *args):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        self.jobs.put((function, args))
+
+    def run(self):
+        while True:
+            function, args = self.jobs.get()
+            try:
+                function(*args)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.jobs.task_done()
+
+    # Blocks until every checkpoint made so far is written
+    def wait(self):
+        self.jobs.join()
+        self.raiseError()
+
+    def raiseError(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
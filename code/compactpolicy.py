@@ -0,0 +1,62 @@
+import io
+import os
+import sys
+import time
+import pickle
+import tracemalloc
+
+from policyfile import isBinaryPolicy
+from qtable import compactPolicy
+
+
+# Loads a saved policy like Player.loadPolicy, and measures the seconds and
+# the bytes of memory it takes
+def loadPolicy(data: bytes):
+    tracemalloc.start()
+    startTime = time.perf_counter()
+    fr = io.BytesIO(data)
+    states_value = pickle.load(fr)
+    numIterations = pickle.load(fr)
+    loadTime = time.perf_counter() - startTime
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return states_value, numIterations, loadTime, memory
+
+
+# Removes the Q-values that are 0 from pickled policies, in place (binary
+# policies have room for every Q-value, so there is nothing to remove)
+if __name__ == "__main__":
+
+    assert len(sys.argv) > 1, "Usage: compactpolicy.py POLICY..."
+
+    for file in sys.argv[1:]:
+        if isBinaryPolicy(file):
+            print(f"'{file}' is a binary policy")
+            continue
+
+        with open(file, 'rb') as fr:
+            data = fr.read()
+        states_value, numIterations, loadTime, memory = loadPolicy(data)
+
+        fw = io.BytesIO()
+        pickle.dump(compactPolicy(states_value), fw)
+        pickle.dump(numIterations, fw)
+        compactedData = fw.getvalue()
+        compacted, numIterations, compactedLoadTime, compactedMemory = loadPolicy(compactedData)
+
+        print(f"'{file}':")
+        print(f"  Entries: {len(states_value)} -> {len(compacted)}")
+        print(f"  File size: {len(data) / 1024:.1f} KiB -> {len(compactedData) / 1024:.1f} KiB")
+        print(f"  Memory: {memory / 1024:.1f} KiB -> {compactedMemory / 1024:.1f} KiB")
+        print(f"  Load time: {loadTime * 1000:.2f} ms -> {compactedLoadTime * 1000:.2f} ms")
+
+        # Like policyfile.writePolicy, the policy is replaced by a temporary
+        # file, so an interrupted run leaves it as it was
+        if len(compacted) < len(states_value):
+            temp = file + ".tmp"
+            with open(temp, 'wb') as fw:
+                fw.write(compactedData)
+                fw.flush()
+                os.fsync(fw.fileno())
+            os.replace(temp, file)
+
@@ -0,0 +1,31 @@
+import sys
+import pickle
+
+from policyfile import isBinaryPolicy, writePolicy
+from qtable import DenseQTable
+from state_encoding import convertPolicy
+
+
+# Converts pickled policies (keyed by state strings or integers) to binary
+# policies, in place. Their hyperparameters were not saved, so they are NaN.
+if __name__ == "__main__":
+
+    assert len(sys.argv) > 1, "Usage: convertpolicy.py POLICY..."
+
+    for file in sys.argv[1:]:
+        if isBinaryPolicy(file):
+            print(f"'{file}' is already converted")
+            continue
+
+        with open(file, 'rb') as fr:
+            states_value = pickle.load(fr)
+            numIterations = pickle.load(fr)
+
+        try:
+            states_value = convertPolicy(states_value)
+        except ValueError as e:
+            print(f"'{file}' can not be converted: {e}")
+            continue
+
+        writePolicy(file, DenseQTable(states_value), numIterations)
+        print(f"Converted '{file}' ({len(states_value)} entries)")
@@ -1,7 +1,4 @@
 from typing import List
-import pygame
-from pygame.locals import *
-from nodes import Node
 from vector import Vector2
 from constants import *
 from random import randint
@@ -20,14 +17,45 @@ class Entity(object):
         self.disablePortal = False
         self.goal = None
         self.directionMethod = self.randomDirection
+        self.cachedPosition = Vector2()
         self.setStartNode(node)
         self.image = None
 
+    # Entities move along the edge from node to target, which is tracked as
+    # the edge id, its length and the progress in pixels along it. The position
+    # is only materialised from these when it is read.
+    @property
+    def position(self):
+        if self.positionStale:
+            origin = self.node.position
+            vector = self.edgeVector
+            position = self.cachedPosition
+            position.x = origin.x + vector.x*self.progress
+            position.y = origin.y + vector.y*self.progress
+            self.positionStale = False
+        return self.cachedPosition
+
+    @position.setter
+    def position(self, position):
+        self.progress = position.manhattanDistanceTo(self.node.position)
+        self.positionStale = True
+
+    def setTarget(self, target):
+        self.target = target
+        if target is self.node:
+            self.edge, self.edgeLength, self.edgeVector = None, 0, self.directions[STOP]
+        else:
+            self.edge, self.edgeLength, self.edgeVector = self.node.getEdgeTo(target)
+        self.positionStale = True
+
     def setPosition(self):
-        self.position = self.node.position.copy()
+        self.progress = 0
+        self.positionStale = True
 
     def update(self, dt):
-        self.position += self.directions[self.direction]*self.speed*dt
+        if self.direction is not STOP:
+            self.progress += self.speed * dt
+            self.positionStale = True
          
         if self.overshotTarget():
             self.node = self.target
@@ -36,20 +64,17 @@ class Entity(object):
             if not self.disablePortal:
                 if self.node.neighbors[PORTAL] is not None:
                     self.node = self.node.neighbors[PORTAL]
-            self.target = self.getNewTarget(direction)
-            if self.target is not self.node:
+            target = self.getNewTarget(direction)
+            if target is not self.node:
                 self.direction = direction
             else:
-                self.target = self.getNewTarget(self.direction)
+                target = self.getNewTarget(self.direction)
 
+            self.setTarget(target)
             self.setPosition()
           
     def validDirection(self, direction):
-        if direction is not STOP:
-            if self.name in self.node.access[direction]:
-                if self.node.neighbors[direction] is not None:
-                    return True
-        return False
+        return direction in self.node.getValidDirections(self.name)
 
     def getNewTarget(self, direction):
         if self.validDirection(direction):
@@ -57,19 +82,17 @@ class Entity(object):
         return self.node
 
     def overshotTarget(self):
-        if self.target is not None:
-            vec1 = self.target.position - self.node.position
-            vec2 = self.position - self.node.position
-            node2Target = vec1.magnitudeSquared()
-            node2Self = vec2.magnitudeSquared()
-            return node2Self >= node2Target
-        return False
+        return self.progress >= self.edgeLength
 
     def reverseDirection(self):
         self.direction *= -1
-        temp = self.node
-        self.node = self.target
-        self.target = temp
+        self.swapNodes()
+
+    # Turns around on the current edge without moving
+    def swapNodes(self):
+        self.progress = self.edgeLength - self.progress
+        self.node, target = self.target, self.node
+        self.setTarget(target)
         
     def oppositeDirection(self, direction):
         if direction is not STOP:
@@ -78,11 +101,8 @@ class Entity(object):
         return False
 
     def validDirections(self) -> List[int]:
-        directions = []
-        for key in [UP, DOWN, LEFT, RIGHT]:
-            if self.validDirection(key):
-                if key != self.direction * -1:
-                    directions.append(key)
+        reverse = self.direction * -1
+        directions = [key for key in self.node.getValidDirections(self.name) if key != reverse]
         if len(directions) == 0:
             directions.append(self.direction * -1)
         return directions
@@ -92,22 +112,26 @@ class Entity(object):
 
     def goalDirection(self, directions):
         distances = []
+        position = self.node.position
+        goal = self.goal
         for direction in directions:
-            vec = self.node.position  + self.directions[direction]*TILEWIDTH - self.goal
-            distances.append(vec.magnitudeSquared())
+            vec = self.directions[direction]
+            x = position.x + vec.x*TILEWIDTH - goal.x
+            y = position.y + vec.y*TILEWIDTH - goal.y
+            distances.append(x**2 + y**2)
         index = distances.index(min(distances))
         return directions[index]
 
     def setStartNode(self, node):
         self.node = node
         self.startNode = node
-        self.target: Node = node
+        self.setTarget(node)
         self.setPosition()
 
     def setBetweenNodes(self, direction):
         if self.node.neighbors[direction] is not None:
-            self.target = self.node.neighbors[direction]
-            self.position = (self.node.position + self.target.position) / 2.0
+            self.setTarget(self.node.neighbors[direction])
+            self.progress = self.edgeLength / 2.0
 
     def reset(self):
         self.setStartNode(self.startNode)
@@ -118,12 +142,12 @@ class Entity(object):
     def setSpeed(self, speed):
         self.speed = speed * TILEWIDTH / 16
 
-    def render(self, screen):
-        if self.visible:
-            if self.image is not None:
-                adjust = Vector2(TILEWIDTH, TILEHEIGHT) / 2
-                p = self.position - adjust
-                screen.blit(self.image, p.asTuple())
-            else:
-                p = self.position.asInt()
-                pygame.draw.circle(screen, self.color, p, self.radius)
\ No newline at end of file
+    def getState(self, nodes):
+        return (self.node.id, self.target.id, self.position.x, self.position.y,
+                self.direction, self.speed, self.visible)
+
+    def setState(self, state, nodes):
+        node, target, x, y, self.direction, self.speed, self.visible = state
+        self.node = nodes.getNodeFromId(node)
+        self.setTarget(nodes.getNodeFromId(target))
+        self.position = Vector2(x, y)
@@ -0,0 +1,131 @@
+from typing import List, Optional
+from constants import *
+from pacman import Pacman
+from run import GameController
+from relative_direction import RelativeDirection
+from state_generation import generateState, getPacmanPreviousRelativeDirection
+
+
+class PacmanEnvironment(object):
+    """
+    Gym-style environment around a GameController, which advances the game
+    from one decision point to the next. A decision point is a frame where
+    Pacman is at a node or the state has changed. States are the integers of
+    state_generation.generateState.
+
+    reset() returns the state at the first decision point, and step(action)
+    takes a RelativeDirection (or None if there are no valid directions) and
+    returns (state, reward, done, info). An episode is a single life: done is
+    True when Pacman dies or the game ends, and info["gameOver"] tells whether
+    the next reset() starts a new game or continues with the next life.
+    The valid relative directions of the returned state are in
+    info["validDirections"] (and validDirections after reset()).
+
+    Rewards are those of the original training loop: ten times the score
+    gained since the last decision point, minus 100 for reversing, and -1000
+    for dying.
+
+    With macroStep the game is advanced with GameController.updateUntilEvent,
+    so the state is only generated on frames with a decision event instead of
+    on every frame. State changes caused by ghost or Pacman movement between
+    events (such as the direction to the closest pellet flipping mid-edge) are
+    then not seen until the next event.
+    """
+
+    def __init__(self, skipRender: bool = True, macroStep: bool = False):
+        self.skipRender = skipRender
+        self.macroStep = macroStep
+        self.game = None
+        self.gameOver = True
+        self.numFrames = 0
+        self.state = None
+        self.validDirections = []
+        self.previousActualDirection = LEFT
+        self.previousStateScore = 0
+        self.choseReverse = False
+
+    def createGame(self) -> GameController:
+        if self.skipRender:
+            return GameController()
+        # Only the demo needs pygame, so the renderer is imported on demand
+        from renderer import RenderedGameController
+        return RenderedGameController()
+
+    def reset(self) -> int:
+        game = self.game
+        if not self.gameOver:
+            # Continue with the next life
+            game.resetLevel()
+        else:
+            if game is None:
+                game = self.game = self.createGame()
+                game.startGame()
+            else:
+                game.resetEpisode()
+            game.update()
+            self.gameOver = False
+            self.numFrames = 0
+            self.previousActualDirection = LEFT # Pacman always starts to move left
+            self.previousStateScore = 0
+
+        return self.setState(generateState(game, self.previousActualDirection))
+
+    def step(self, action: Optional[RelativeDirection]):
+        game = self.game
+        pacman = game.pacman
+
+        if action is not None:
+            pacman.learntDirection = action.toActualDirection(pacman.direction)
+            previousRelativeDirection = getPacmanPreviousRelativeDirection(pacman, self.previousActualDirection)
+            self.choseReverse = action.isOppositeDirection(previousRelativeDirection)
+        else:
+            pacman.learntDirection = STOP
+
+        while True:
+            if self.macroStep:
+                numFrames, self.previousActualDirection = game.updateUntilEvent()
+                self.numFrames += numFrames
+            else:
+                self.previousActualDirection = pacman.direction
+                game.update()
+                self.numFrames += 1
+
+            if not pacman.alive:
+                self.gameOver = game.levelLost
+                state = generateState(game, self.previousActualDirection)
+                return state, -1000, True, self.getInfo(True, [])
+
+            state = generateState(game, self.previousActualDirection)
+            if game.levelLost or game.levelWon:
+                self.gameOver = True
+                return state, self.getReward(), True, self.getInfo(False, [])
+
+            if pacman.isAtNode or state != self.state:
+                reward = self.getReward()
+                self.previousStateScore = game.score
+                self.setState(state)
+                return state, reward, False, self.getInfo(False, self.validDirections)
+
+    def setState(self, state: int) -> int:
+        self.state = state
+        self.validDirections = getValidRelativeDirections(self.game.pacman)
+        return state
+
+    def getReward(self) -> int:
+        reward = (self.game.score - self.previousStateScore) * 10
+        if self.choseReverse:
+            reward -= 100
+        return reward
+
+    def getInfo(self, died: bool, validDirections: List[RelativeDirection]) -> dict:
+        return {
+            "validDirections": validDirections,
+            "died": died,
+            "gameOver": self.gameOver,
+            "levelWon": self.game.levelWon,
+            "numFrames": self.numFrames
+        }
+
+
+def getValidRelativeDirections(pacman: Pacman) -> List[RelativeDirection]:
+    return list(pacman.getView().relativeDirections)
@@ -1,21 +1,30 @@
-import pygame
 from entity import Entity
 from constants import *
-from sprites import FruitSprites
 
 class Fruit(Entity):
-    def __init__(self, node, level=0):
+    def __init__(self, node, timers, level=0):
         Entity.__init__(self, node)
         self.name = FRUIT
         self.color = GREEN
         self.lifespan = 5
-        self.timer = 0
+        self.timers = timers
+        self.timer = timers.schedule(self.lifespan, self.expire)
         self.destroy = False
         self.points = 100 + level*20
         self.setBetweenNodes(RIGHT)
-        self.sprites = FruitSprites(self, level)
 
+    def getState(self, nodes):
+        return (Entity.getState(self, nodes), self.timer.getElapsed(), self.destroy, self.points)
+
+    def setState(self, state, nodes):
+        entityState, timer, self.destroy, self.points = state
+        Entity.setState(self, entityState, nodes)
+        self.timer.cancel()
+        self.timer = self.timers.schedule(self.lifespan, self.expire, timer)
+
+    # The fruit doesn't move, and is destroyed by its timer once its lifespan has passed
     def update(self, dt):
-        self.timer += dt
-        if self.timer >= self.lifespan:
-            self.destroy = True
\ No newline at end of file
+        pass
+
+    def expire(self):
+        self.destroy = True
\ No newline at end of file
@@ -1,22 +1,19 @@
-import pygame
 from typing import List
 
-from pygame.locals import *
 from vector import Vector2
 from constants import *
 from entity import Entity
-from modes import ModeController
-from sprites import GhostSprites
+from modes import ModeController, MainMode
 
 class Ghost(Entity):
-    def __init__(self, node, pacman=None, blinky=None):
+    def __init__(self, node, pacman=None, blinky=None, mainmode=None):
         Entity.__init__(self, node)
         self.name = GHOST
         self.points = 200
         self.goal = Vector2()
         self.directionMethod = self.goalDirection
         self.pacman = pacman
-        self.mode = ModeController(self)
+        self.mode = ModeController(self, mainmode if mainmode is not None else MainMode())
         self.blinky = blinky
         self.homeNode = node
 
@@ -25,8 +22,26 @@ class Ghost(Entity):
         self.points = 200
         self.directionMethod = self.goalDirection
 
+    # Unlike reset (used when Pacman loses a life), this also restores the
+    # speed and mode of a newly constructed ghost
+    def resetEpisode(self):
+        self.reset()
+        self.setSpeed(100)
+        self.goal.set(0, 0)
+        self.mode.reset()
+
+    def getState(self, nodes):
+        return (Entity.getState(self, nodes), self.goal.x, self.goal.y, self.points,
+                self.directionMethod == self.randomDirection, self.mode.getState())
+
+    def setState(self, state, nodes):
+        entityState, goalx, goaly, self.points, randomDirection, modeState = state
+        Entity.setState(self, entityState, nodes)
+        self.goal = Vector2(goalx, goaly)
+        self.directionMethod = self.randomDirection if randomDirection else self.goalDirection
+        self.mode.setState(modeState)
+
     def update(self, dt):
-        self.sprites.update(dt)
         self.mode.update(dt)
         if self.mode.current is SCATTER:
             self.scatter()
@@ -34,14 +49,16 @@ class Ghost(Entity):
             self.chase()
         Entity.update(self, dt)
 
+    # The goal vector is owned by the ghost and set in place, so it never
+    # aliases (and follows) the position of Pacman or a node
     def scatter(self):
-        self.goal = Vector2()
+        self.goal.set(0, 0)
 
     def chase(self):
-        self.goal = self.pacman.position
+        self.goal.set(self.pacman.position.x, self.pacman.position.y)
 
     def spawn(self):
-        self.goal = self.spawnNode.position
+        self.goal.set(self.spawnNode.position.x, self.spawnNode.position.y)
 
     def setSpawnNode(self, node):
         self.spawnNode = node
@@ -68,77 +85,94 @@ class Ghost(Entity):
 
 
 class Blinky(Ghost):
-    def __init__(self, node, pacman=None, blinky=None):
-        Ghost.__init__(self, node, pacman, blinky)
+    def __init__(self, node, pacman=None, blinky=None, mainmode=None):
+        Ghost.__init__(self, node, pacman, blinky, mainmode)
         self.name = BLINKY
         self.color = RED
-        self.sprites = GhostSprites(self)
 
 
 class Pinky(Ghost):
-    def __init__(self, node, pacman=None, blinky=None):
-        Ghost.__init__(self, node, pacman, blinky)
+    def __init__(self, node, pacman=None, blinky=None, mainmode=None):
+        Ghost.__init__(self, node, pacman, blinky, mainmode)
         self.name = PINKY
         self.color = PINK
-        self.sprites = GhostSprites(self)
 
     def scatter(self):
-        self.goal = Vector2(TILEWIDTH*NCOLS, 0)
+        self.goal.set(TILEWIDTH*NCOLS, 0)
 
     def chase(self):
-        self.goal = self.pacman.position + self.pacman.directions[self.pacman.direction] * TILEWIDTH * 4
+        position = self.pacman.position
+        vec = self.pacman.directions[self.pacman.direction]
+        self.goal.set(position.x + vec.x * TILEWIDTH * 4, position.y + vec.y * TILEWIDTH * 4)
 
 
 class Inky(Ghost):
-    def __init__(self, node, pacman=None, blinky=None):
-        Ghost.__init__(self, node, pacman, blinky)
+    def __init__(self, node, pacman=None, blinky=None, mainmode=None):
+        Ghost.__init__(self, node, pacman, blinky, mainmode)
         self.name = INKY
         self.color = TEAL
-        self.sprites = GhostSprites(self)
 
     def scatter(self):
-        self.goal = Vector2(TILEWIDTH*NCOLS, TILEHEIGHT*NROWS)
+        self.goal.set(TILEWIDTH*NCOLS, TILEHEIGHT*NROWS)
 
     def chase(self):
-        vec1 = self.pacman.position + self.pacman.directions[self.pacman.direction] * TILEWIDTH * 2
-        vec2 = (vec1 - self.blinky.position) * 2
-        self.goal = self.blinky.position + vec2
+        position = self.pacman.position
+        vec = self.pacman.directions[self.pacman.direction]
+        blinky = self.blinky.position
+        x = position.x + vec.x * TILEWIDTH * 2
+        y = position.y + vec.y * TILEWIDTH * 2
+        self.goal.set(blinky.x + (x - blinky.x) * 2, blinky.y + (y - blinky.y) * 2)
 
 
 class Clyde(Ghost):
-    def __init__(self, node, pacman=None, blinky=None):
-        Ghost.__init__(self, node, pacman, blinky)
+    def __init__(self, node, pacman=None, blinky=None, mainmode=None):
+        Ghost.__init__(self, node, pacman, blinky, mainmode)
         self.name = CLYDE
         self.color = ORANGE
-        self.sprites = GhostSprites(self)
 
     def scatter(self):
-        self.goal = Vector2(0, TILEHEIGHT*NROWS)
+        self.goal.set(0, TILEHEIGHT*NROWS)
 
     def chase(self):
-        d = self.pacman.position - self.position
-        ds = d.magnitudeSquared()
+        ds = self.pacman.position.distanceSquaredTo(self.position)
         if ds <= (TILEWIDTH * 8)**2:
             self.scatter()
         else:
-            self.goal = self.pacman.position + self.pacman.directions[self.pacman.direction] * TILEWIDTH * 4
+            position = self.pacman.position
+            vec = self.pacman.directions[self.pacman.direction]
+            self.goal.set(position.x + vec.x * TILEWIDTH * 4, position.y + vec.y * TILEWIDTH * 4)
 
 
 class GhostGroup(object):
     def __init__(self, node, pacman):
-        self.blinky = Blinky(node, pacman)
-        self.pinky = Pinky(node, pacman)
-        self.inky = Inky(node, pacman, self.blinky)
-        self.clyde = Clyde(node, pacman)
+        self.mainmode = MainMode()
+        self.blinky = Blinky(node, pacman, mainmode=self.mainmode)
+        self.pinky = Pinky(node, pacman, mainmode=self.mainmode)
+        self.inky = Inky(node, pacman, self.blinky, self.mainmode)
+        self.clyde = Clyde(node, pacman, mainmode=self.mainmode)
         self.ghosts: List[Ghost] = [self.blinky, self.pinky, self.inky, self.clyde]
 
     def __iter__(self):
         return iter(self.ghosts)
 
     def update(self, dt):
+        self.mainmode.update(dt)
         for ghost in self:
             ghost.update(dt)
 
+    # Seconds until a ghost changes mode by a timer, which is either the
+    # scatter/chase phase changing for a ghost following it or FREIGHT ending
+    # (None if no ghost is in any of those modes). Ghosts leave SPAWN when
+    # they reach the spawn node, which is not timed.
+    def getTimeToModeChange(self):
+        times = []
+        for ghost in self:
+            if ghost.mode.current is FREIGHT:
+                times.append(ghost.mode.getTimeToFreightEnd())
+            elif ghost.mode.current is not SPAWN:
+                times.append(self.mainmode.getTimeToChange())
+        return min(times) if len(times) > 0 else None
+
     def startFreight(self):
         for ghost in self:
             ghost.startFreight()
@@ -168,7 +202,8 @@ class GhostGroup(object):
         for ghost in self:
             ghost.reset()
 
-    def render(self, screen):
+    def resetEpisode(self):
+        self.mainmode.reset()
         for ghost in self:
-            ghost.render(screen)
+            ghost.resetEpisode()
 
@@ -0,0 +1,142 @@
+from constants import *
+from nodes import NodeGroup, NEIGHBORDIRECTIONS
+from pellets import PelletGroup
+
+DIRECTIONS = NEIGHBORDIRECTIONS
+ACCESSNAMES = (PACMAN, BLINKY, PINKY, INKY, CLYDE, FRUIT)
+
+
+class CompiledMaze(object):
+    """
+    Immutable template of a maze, built once from a maze file and its
+    MazeData entry. Node ids are indices into nodeKeys, which keeps the
+    insertion order of NodeGroup.nodesLUT.
+
+    neighbors[i] holds the neighbor id (or -1) of node i for each of
+    DIRECTIONS, and access[i] holds the entity names that may leave node i
+    in each of UP, DOWN, LEFT, RIGHT, with the initial access rules of
+    GameController.startGame already applied. accessMasks[i] holds the same
+    rules as the bitmasks of Node.access.
+
+    edges holds the (first, second) node ids of every axis-aligned edge
+    between neighboring nodes, edgeIndex[i] the edge id (or -1) of node i for
+    each of UP, DOWN, LEFT, RIGHT, and edgePellets[e] the (offset, pellet
+    index) pairs of the pellets on edge e, end nodes included, sorted by their
+    offset from the first node.
+    """
+    def __init__(self, name, nodeKeys, neighbors, access, accessMasks, homekey, homeNodes, portalPairs, pellets,
+                 edges, edgeIndex, edgePellets, data, rotdata):
+        self.name = name
+        self.nodeKeys = nodeKeys
+        self.neighbors = neighbors
+        self.access = access
+        self.accessMasks = accessMasks
+        self.homekey = homekey
+        self.homeNodes = homeNodes
+        self.portalPairs = portalPairs
+        self.pellets = pellets
+        self.edges = edges
+        self.edgeIndex = edgeIndex
+        self.edgePellets = edgePellets
+        self.data = data
+        self.rotdata = rotdata
+        self.data.flags.writeable = False
+        self.rotdata.flags.writeable = False
+
+
+class AccessEntity(object):
+    """Stand-in for an entity when applying access rules at compile time"""
+    def __init__(self, name):
+        self.name = name
+
+
+compiledMazes = {}
+
+def getCompiledMaze(mazeobj):
+    """
+    Returns the compiled template of the maze, which is cached for the
+    lifetime of the process.
+    """
+    maze = compiledMazes.get(mazeobj.name)
+    if maze is None:
+        maze = compiledMazes[mazeobj.name] = compileMaze(mazeobj)
+    return maze
+
+
+def compileMaze(mazeobj):
+    mazefile = mazeobj.name + ".txt"
+    nodes = NodeGroup(mazefile)
+    mazeobj.setPortalPairs(nodes)
+    mazeKeys = set(nodes.nodesLUT.keys())
+    mazeobj.connectHomeNodes(nodes)
+
+    pacman = AccessEntity(PACMAN)
+    ghosts = [AccessEntity(name) for name in (BLINKY, PINKY, INKY, CLYDE)]
+    inky, clyde = ghosts[2], ghosts[3]
+    nodes.denyHomeAccess(pacman)
+    nodes.denyHomeAccessList(ghosts)
+    nodes.getNodeFromTiles(*mazeobj.addOffset(0, 3)).denyAccess(RIGHT, inky)
+    nodes.getNodeFromTiles(*mazeobj.addOffset(4, 3)).denyAccess(LEFT, clyde)
+    mazeobj.denyGhostsAccess(ghosts, nodes)
+
+    nodeList = nodes.nodeList
+    ids = nodes.nodeIds
+    neighbors = tuple(map(tuple, nodes.neighborTable.tolist()))
+    access = tuple(
+        tuple(tuple(name for name in ACCESSNAMES if node.access[d] >> name & 1) for d in (UP, DOWN, LEFT, RIGHT))
+        for node in nodeList)
+    accessMasks = tuple(
+        tuple(node.access[d] for d in (UP, DOWN, LEFT, RIGHT))
+        for node in nodeList)
+
+    homeNodes = tuple(ids[node] for key, node in nodes.nodesLUT.items() if key not in mazeKeys)
+    portalPairs = tuple(
+        (ids[nodes.getNodeFromTiles(*pair1)], ids[nodes.getNodeFromTiles(*pair2)])
+        for pair1, pair2 in mazeobj.portalPairs.values())
+
+    pelletgroup = PelletGroup(mazefile)
+    pellets = tuple((p.row, p.column, p.name) for p in pelletgroup.allPellets)
+    edges, edgeIndex, edgePellets = compileEdges(nodeList, ids, pelletgroup.allPellets)
+
+    return CompiledMaze(
+        mazeobj.name,
+        nodes.nodeKeys, neighbors, access, accessMasks, nodes.homekey, homeNodes, portalPairs, pellets,
+        edges, edgeIndex, edgePellets,
+        nodes.readMazeFile(mazefile), nodes.readMazeFile(mazeobj.name + "_rotation.txt"))
+
+
+def compileEdges(nodeList, ids, pellets):
+    edgeIds = {}
+    edgeIndex = []
+    for node in nodeList:
+        indices = []
+        for direction in (UP, DOWN, LEFT, RIGHT):
+            neighbor = node.neighbors[direction]
+            if neighbor is None or not isAxisAligned(node.position, neighbor.position):
+                indices.append(-1)
+                continue
+            key = tuple(sorted((ids[node], ids[neighbor])))
+            if key not in edgeIds:
+                edgeIds[key] = len(edgeIds)
+            indices.append(edgeIds[key])
+        edgeIndex.append(tuple(indices))
+
+    edges = tuple(edgeIds.keys())
+    edgePellets = []
+    for first, second in edges:
+        start = nodeList[first].position
+        end = nodeList[second].position
+        edgePellets.append(tuple(sorted(
+            (start.manhattanDistanceTo(pellet.position), pellet.index)
+            for pellet in pellets if isOnSegment(pellet.position, start, end))))
+    return edges, tuple(edgeIndex), tuple(edgePellets)
+
+
+def isAxisAligned(start, end):
+    return start.x == end.x or start.y == end.y
+
+
+def isOnSegment(position, start, end):
+    if start.x == end.x:
+        return position.x == start.x and min(start.y, end.y) <= position.y <= max(start.y, end.y)
+    return position.y == start.y and min(start.x, end.x) <= position.x <= max(start.x, end.x)
@@ -0,0 +1,86 @@
+import numpy as np
+from constants import *
+
+SLOTDIRECTIONS = (UP, DOWN, LEFT, RIGHT)
+
+
+class MazePaths(object):
+    """
+    Shortest paths between all nodes of a compiled maze for one entity,
+    following the initial access rules of the compiled maze. Arriving at a
+    node with a portal continues from its pair at no cost, as entities do.
+
+    distances[i, j] is the length in pixels of the shortest path from node i
+    to node j (inf if unreachable), nextNode[i, j] the node the path reaches
+    first (i if i == j, -1 if unreachable) and nextDirection[i, j] the
+    direction to leave node i in (STOP if i == j or unreachable).
+    """
+    def __init__(self, name, distances, nextNode, nextDirection):
+        self.name = name
+        self.distances = distances
+        self.nextNode = nextNode
+        self.nextDirection = nextDirection
+        for array in (distances, nextNode, nextDirection):
+            array.flags.writeable = False
+
+    def getDistance(self, source, target):
+        return float(self.distances[source, target])
+
+    def getNextDirection(self, source, target):
+        return int(self.nextDirection[source, target])
+
+    def getPath(self, source, target):
+        if self.nextNode[source, target] < 0:
+            return None
+        path = [source]
+        while source != target:
+            source = int(self.nextNode[source, target])
+            path.append(source)
+        return path
+
+
+# Paths are only computed when they are asked for, and kept like the
+# compiled mazes (see mazecompiler.getCompiledMaze) for the lifetime of the
+# process
+mazePaths = {}
+
+def getMazePaths(maze, name=PACMAN):
+    """Returns the shortest paths of the entity in the compiled maze, computed once per process"""
+    key = (maze.name, name)
+    paths = mazePaths.get(key)
+    if paths is None:
+        paths = mazePaths[key] = computeMazePaths(maze, name)
+    return paths
+
+
+def computeMazePaths(maze, name):
+    numNodes = len(maze.nodeKeys)
+    positions = np.array(maze.nodeKeys, dtype=float)
+    distances = np.full((numNodes, numNodes), np.inf)
+    nextNode = np.full((numNodes, numNodes), -1, dtype=np.int64)
+    nextDirection = np.full((numNodes, numNodes), STOP, dtype=np.int64)
+
+    for i in range(numNodes):
+        distances[i, i] = 0
+        nextNode[i, i] = i
+        for slot, direction in enumerate(SLOTDIRECTIONS):
+            neighbor = maze.neighbors[i][slot]
+            if neighbor < 0 or name not in maze.access[i][slot]:
+                continue
+            length = np.abs(positions[i] - positions[neighbor]).sum()
+            portal = maze.neighbors[neighbor][4]
+            arrival = portal if portal >= 0 else neighbor
+            if length < distances[i, arrival]:
+                distances[i, arrival] = length
+                nextNode[i, arrival] = arrival
+                nextDirection[i, arrival] = direction
+
+    # Floyd-Warshall, relaxing all pairs through node k at once
+    for k in range(numNodes):
+        throughK = distances[:, k, None] + distances[None, k, :]
+        shorter = throughK < distances
+        distances = np.where(shorter, throughK, distances)
+        nextNode = np.where(shorter, nextNode[:, k, None], nextNode)
+        nextDirection = np.where(shorter, nextDirection[:, k, None], nextDirection)
+
+    return MazePaths(name, distances.astype(np.float32), nextNode.astype(np.int16), nextDirection.astype(np.int8))
@@ -1,10 +1,25 @@
 from constants import *
 
+# Global scatter/chase phase shared by all ghosts of a GhostGroup, which
+# advances it once per update. The phases alternate, each lasting its
+# duration in PHASETIMES.
+PHASETIMES = {SCATTER: 7/5, CHASE: 20/5}
+
 class MainMode(object):
     def __init__(self):
         self.timer = 0
         self.scatter()
 
+    def reset(self):
+        self.timer = 0
+        self.scatter()
+
+    def getState(self):
+        return (self.mode, self.timer, self.time)
+
+    def setState(self, state):
+        self.mode, self.timer, self.time = state
+
     def update(self, dt):
         self.timer += dt
         if self.timer >= self.time:
@@ -13,27 +28,49 @@ class MainMode(object):
             elif self.mode is CHASE:
                 self.scatter()
 
+    # Seconds until the phase changes
+    def getTimeToChange(self):
+        return self.time - self.timer
+
     def scatter(self):
         self.mode = SCATTER
-        self.time = 7/5
+        self.time = PHASETIMES[SCATTER]
         self.timer = 0
 
     def chase(self):
         self.mode = CHASE
-        self.time = 20/5
+        self.time = PHASETIMES[CHASE]
         self.timer = 0
 
 
+# Mode of a single ghost: the phase of the shared MainMode, unless it is
+# overridden by FREIGHT or SPAWN. The MainMode is updated by its owner.
 class ModeController(object):
-    def __init__(self, entity):
+    def __init__(self, entity, mainmode):
         self.timer = 0
         self.time = None
-        self.mainmode = MainMode()
+        self.mainmode = mainmode
         self.current = self.mainmode.mode
         self.entity = entity 
 
+    def reset(self):
+        self.timer = 0
+        self.time = None
+        self.current = self.mainmode.mode
+
+    def getState(self):
+        return (self.current, self.timer, self.time)
+
+    def setState(self, state):
+        self.current, self.timer, self.time = state
+
+    # Seconds until FREIGHT ends, or None if not in FREIGHT
+    def getTimeToFreightEnd(self):
+        if self.current is FREIGHT:
+            return self.time - self.timer
+        return None
+
     def update(self, dt):
-        self.mainmode.update(dt)
         if self.current is FREIGHT:
             self.timer += dt
             if self.timer >= self.time:
@@ -1,32 +1,85 @@
-import pygame
 from vector import Vector2
 from constants import *
 import numpy as np
 
+ACCESSDIRECTIONS = (UP, DOWN, LEFT, RIGHT)
+NEIGHBORDIRECTIONS = (UP, DOWN, LEFT, RIGHT, PORTAL)
+NEIGHBORSLOTS = {direction: slot for slot, direction in enumerate(NEIGHBORDIRECTIONS)}
+
+# Access rules are bitmasks with bit 1 << name set for every entity name
+# that may leave a node in a direction
+def accessMask(names):
+    mask = 0
+    for name in names:
+        mask |= 1 << name
+    return mask
+
+ALLACCESS = accessMask((PACMAN, BLINKY, PINKY, INKY, CLYDE, FRUIT))
+
+
 class Node(object):
     def __init__(self, x, y):
+        self.id = None
         self.position = Vector2(x, y)
         self.neighbors = {UP:None, DOWN:None, LEFT:None, RIGHT:None, PORTAL:None}
-        self.access = {UP:[PACMAN, BLINKY, PINKY, INKY, CLYDE, FRUIT], 
-                       DOWN:[PACMAN, BLINKY, PINKY, INKY, CLYDE, FRUIT], 
-                       LEFT:[PACMAN, BLINKY, PINKY, INKY, CLYDE, FRUIT], 
-                       RIGHT:[PACMAN, BLINKY, PINKY, INKY, CLYDE, FRUIT]}
+        self.access = {UP:ALLACCESS, DOWN:ALLACCESS, LEFT:ALLACCESS, RIGHT:ALLACCESS}
+        self.accessState = None
+        self.validDirections = {}
+        self.edges = {}
+        self.edgeShapes = {}
 
     def denyAccess(self, direction, entity):
-        if entity.name in self.access[direction]:
-            self.access[direction].remove(entity.name)
+        bit = 1 << entity.name
+        if self.access[direction] & bit:
+            self.access[direction] &= ~bit
+            self.accessChanged()
 
     def allowAccess(self, direction, entity):
-        if entity.name not in self.access[direction]:
-            self.access[direction].append(entity.name)
+        bit = 1 << entity.name
+        if not self.access[direction] & bit:
+            self.access[direction] |= bit
+            self.accessChanged()
+
+    def accessChanged(self):
+        self.accessState = None
+        self.validDirections = {}
+
+    # Directions (in ACCESSDIRECTIONS order) that entities with the name may
+    # leave the node in, cached per name until the access rules change. The
+    # neighbors must not change once this is used.
+    def getValidDirections(self, name):
+        directions = self.validDirections.get(name)
+        if directions is None:
+            directions = self.validDirections[name] = tuple(
+                direction for direction in ACCESSDIRECTIONS
+                if self.access[direction] >> name & 1 and self.neighbors[direction] is not None)
+        return directions
+
+    # Edge id (None outside compiled mazes), length and unit vector of the
+    # edge to a neighbor, computed once per neighbor
+    def getEdgeTo(self, neighbor):
+        shape = self.edgeShapes.get(neighbor)
+        if shape is None:
+            x = neighbor.position.x - self.position.x
+            y = neighbor.position.y - self.position.y
+            edge = self.edges.get(neighbor)
+            shape = (edge[0] if edge is not None else None, abs(x) + abs(y),
+                     Vector2((x > 0) - (x < 0), (y > 0) - (y < 0)))
+            self.edgeShapes[neighbor] = shape
+        return shape
+
+    # The access masks in ACCESSDIRECTIONS order, cached until they change
+    def getAccessState(self):
+        if self.accessState is None:
+            self.accessState = tuple(self.access[direction] for direction in ACCESSDIRECTIONS)
+        return self.accessState
 
-    def render(self, screen):
-        for n in self.neighbors.keys():
-            if self.neighbors[n] is not None:
-                line_start = self.position.asTuple()
-                line_end = self.neighbors[n].position.asTuple()
-                pygame.draw.line(screen, WHITE, line_start, line_end, 4)
-                pygame.draw.circle(screen, RED, self.position.asInt(), 12)
+    def setAccessState(self, state):
+        if state is not self.accessState:
+            if state != self.getAccessState():
+                self.access = dict(zip(ACCESSDIRECTIONS, state))
+                self.validDirections = {}
+            self.accessState = state
 
 
 class NodeGroup(object):
@@ -40,6 +93,71 @@ class NodeGroup(object):
         self.connectHorizontally(data)
         self.connectVertically(data)
         self.homekey = None
+        self.buildGraph()
+
+    @classmethod
+    def fromCompiledMaze(cls, maze):
+        nodes = cls.__new__(cls)
+        nodes.level = maze.name + ".txt"
+        nodes.nodesLUT = {}
+        nodes.nodeSymbols = ['+', 'P', 'n']
+        nodes.pathSymbols = ['.', '-', '|', 'p']
+        nodeList = [Node(x, y) for x, y in maze.nodeKeys]
+        for key, node, neighbors, access in zip(maze.nodeKeys, nodeList, maze.neighbors, maze.accessMasks):
+            nodes.nodesLUT[key] = node
+            for direction, index in zip((UP, DOWN, LEFT, RIGHT, PORTAL), neighbors):
+                if index >= 0:
+                    node.neighbors[direction] = nodeList[index]
+            node.setAccessState(access)
+        # node.edges maps each neighbor to the id of the edge between them, and
+        # whether node is the first node of that edge
+        for i, (node, edgeIndex) in enumerate(zip(nodeList, maze.edgeIndex)):
+            for direction, edge in zip((UP, DOWN, LEFT, RIGHT), edgeIndex):
+                if edge >= 0:
+                    node.edges[node.neighbors[direction]] = (edge, maze.edges[edge][0] == i)
+            for direction in (UP, DOWN, LEFT, RIGHT):
+                if node.neighbors[direction] is not None:
+                    node.getEdgeTo(node.neighbors[direction])
+        nodes.homekey = maze.homekey
+        nodes.buildGraph()
+        return nodes
+
+    # Integer indexed view of the graph, which the Node objects stay views of:
+    # node i is nodeList[i] (with node.id == i) at pixels nodeKeys[i], or
+    # (nodeX[i], nodeY[i]), and neighborTable[i] holds the ids of its
+    # neighbors (-1 if none) in NEIGHBORDIRECTIONS order. Built in the
+    # insertion order of nodesLUT, so ids match those of the compiled maze,
+    # and built again by every method that adds or connects nodes.
+    def buildGraph(self):
+        self.nodeList = list(self.nodesLUT.values())
+        self.nodeKeys = tuple(self.nodesLUT.keys())
+        self.nodeIds = {}
+        for i, node in enumerate(self.nodeList):
+            node.id = i
+            self.nodeIds[node] = i
+        self.nodeX = np.array([x for x, y in self.nodeKeys], dtype=np.int32)
+        self.nodeY = np.array([y for x, y in self.nodeKeys], dtype=np.int32)
+        self.neighborTable = np.array([
+            [neighbor.id if neighbor is not None else -1 for neighbor in map(node.neighbors.get, NEIGHBORDIRECTIONS)]
+            for node in self.nodeList], dtype=np.int32).reshape(-1, len(NEIGHBORDIRECTIONS))
+        for array in (self.nodeX, self.nodeY, self.neighborTable):
+            array.flags.writeable = False
+
+    def getNodeFromId(self, id):
+        return self.nodeList[id]
+
+    def getNeighborId(self, id, direction):
+        return int(self.neighborTable[id, NEIGHBORSLOTS[direction]])
+
+    def getAccessState(self):
+        return tuple(node.getAccessState() for node in self.nodeList)
+
+    def setAccessState(self, state):
+        for node, access in zip(self.nodeList, state):
+            node.setAccessState(access)
+
+    def resetAccess(self, maze):
+        self.setAccessState(maze.accessMasks)
 
     def readMazeFile(self, textfile):
         return np.loadtxt(textfile, dtype='<U1')
@@ -97,6 +215,7 @@ class NodeGroup(object):
         if key1 in self.nodesLUT.keys() and key2 in self.nodesLUT.keys():
             self.nodesLUT[key1].neighbors[PORTAL] = self.nodesLUT[key2]
             self.nodesLUT[key2].neighbors[PORTAL] = self.nodesLUT[key1]
+            self.buildGraph()
 
     def createHomeNodes(self, xoffset, yoffset):
         homedata = np.array([['X','X','+','X','X'],
@@ -109,23 +228,20 @@ class NodeGroup(object):
         self.connectHorizontally(homedata, xoffset, yoffset)
         self.connectVertically(homedata, xoffset, yoffset)
         self.homekey = self.constructKey(xoffset+2, yoffset)
+        self.buildGraph()
         return self.homekey
 
     def connectHomeNodes(self, homekey, otherkey, direction):     
         key = self.constructKey(*otherkey)
         self.nodesLUT[homekey].neighbors[direction] = self.nodesLUT[key]
         self.nodesLUT[key].neighbors[direction*-1] = self.nodesLUT[homekey]
+        self.buildGraph()
 
     def getNodeFromPixels(self, xpixel, ypixel):
-        if (xpixel, ypixel) in self.nodesLUT.keys():
-            return self.nodesLUT[(xpixel, ypixel)]
-        return None
+        return self.nodesLUT.get((xpixel, ypixel))
 
     def getNodeFromTiles(self, col, row):
-        x, y = self.constructKey(col, row)
-        if (x, y) in self.nodesLUT.keys():
-            return self.nodesLUT[(x, y)]
-        return None
+        return self.nodesLUT.get(self.constructKey(col, row))
 
     def denyAccess(self, col, row, direction, entity):
         node = self.getNodeFromTiles(col, row)
@@ -159,16 +275,10 @@ class NodeGroup(object):
         for entity in entities:
             self.allowHomeAccess(entity)
 
-    def render(self, screen):
-        for node in self.nodesLUT.values():
-            node.render(screen)
-        
     # returns a list of all nodes in (x,y) format
     def getListOfNodesPixels(self):
         return list(self.nodesLUT)
 
     # returns a node in (x,y) format
     def getPixelsFromNode(self, node):
-        id = list(self.nodesLUT.values()).index(node)
-        listOfPix = self.getListOfNodesPixels()
-        return listOfPix[id]
\ No newline at end of file
+        return self.nodeKeys[node.id]
\ No newline at end of file
@@ -1,11 +1,33 @@
-from typing import List
-import pygame
-from pygame.locals import *
+from typing import Tuple
 from nodes import Node
 from vector import Vector2
 from constants import *
 from entity import Entity
-from sprites import PacmanSprites
+from relative_direction import RelativeDirection
+
+
+class PacmanView(object):
+    """
+    What Pacman can do from where he is: the valid directions, the same
+    directions relative to his direction, and the (direction, relative
+    direction, node) of the nodes he can head for next. At a node these are
+    the neighbors in the valid directions, and between nodes the target and
+    the node he came from.
+    """
+    def __init__(self, pacman, validDirections):
+        direction = pacman.direction
+        self.validDirections = validDirections
+        self.relativeDirections = tuple(
+            RelativeDirection.fromActualDirection(direction, validDirection)
+            for validDirection in validDirections)
+        if pacman.isAtNode:
+            self.neighbors = tuple(
+                (validDirection, relativeDirection, pacman.node.neighbors[validDirection])
+                for validDirection, relativeDirection in zip(validDirections, self.relativeDirections))
+        else:
+            self.neighbors = tuple(
+                (neighborDirection, RelativeDirection.fromActualDirection(direction, neighborDirection), node)
+                for neighborDirection, node in ((direction, pacman.target), (-direction, pacman.node)))
 
 class Pacman(Entity):
     def __init__(self, node):
@@ -15,9 +37,10 @@ class Pacman(Entity):
         self.direction = LEFT
         self.setBetweenNodes(LEFT)
         self.alive = True
-        self.sprites = PacmanSprites(self)
         self.isAtNode = False
         self.learntDirection: int = STOP
+        self.viewKey = None
+        self.view = None
 
     def reset(self):
         Entity.reset(self)
@@ -26,8 +49,13 @@ class Pacman(Entity):
         self.isAtNode = False
         self.learntDirection = STOP
         self.alive = True
-        self.image = self.sprites.getStartImage()
-        self.sprites.reset()
+
+    def getState(self, nodes):
+        return (Entity.getState(self, nodes), self.alive, self.isAtNode, self.learntDirection)
+
+    def setState(self, state, nodes):
+        entityState, self.alive, self.isAtNode, self.learntDirection = state
+        Entity.setState(self, entityState, nodes)
 
     def die(self):
         self.alive = False
@@ -38,15 +66,13 @@ class Pacman(Entity):
         desiredDirection = self.getDesiredDirection()
         if desiredDirection != self.direction:
             if desiredDirection == STOP:
-                self.target = self.node
+                self.setTarget(self.node)
 
             elif self.isAtNode:
-                self.target = self.node.neighbors[desiredDirection]
+                self.setTarget(self.node.neighbors[desiredDirection])
 
             elif desiredDirection == self.direction * -1:
-                tempTarget = self.target
-                self.target = self.node
-                self.node = tempTarget
+                self.swapNodes()
 
             else:
                 assert "Invalid situation - check it out!"
@@ -54,17 +80,11 @@ class Pacman(Entity):
             self.direction = desiredDirection
             # print(f"Pacman new direction: {self.direction}")
 
-        oldPosition = self.position.copy();
-
-        self.sprites.update(dt)
-        velocity = self.directions[self.direction] * self.speed * dt
-        self.position += velocity
-
-        # print(f'Pacman moving: {oldPosition} -> {self.position}  (direction={self.direction})')
-        oldPosition = self.position.copy();
-        
-        if velocity.x != 0 or velocity.y != 0:
-            self.isAtNode = False
+        if self.direction is not STOP:
+            self.progress += self.speed * dt
+            self.positionStale = True
+            if self.speed * dt != 0:
+                self.isAtNode = False
         
         if self.overshotTarget():
             # print("Pacman overshot target")
@@ -73,60 +93,50 @@ class Pacman(Entity):
                 self.node = self.node.neighbors[PORTAL]
             
             if self.direction in self.validDirectionsFromNode(self.node):
-                self.target = self.node.neighbors[self.direction]
+                self.setTarget(self.node.neighbors[self.direction])
             else:
-                self.target = self.node
+                self.setTarget(self.node)
                 self.direction = STOP
 
             self.setPosition()
             self.isAtNode = True
 
     def getDesiredDirection(self):
-        if self.learntDirection in self.getValidDirections():
+        if self.learntDirection in self.getView().validDirections:
             return self.learntDirection
         return self.direction
 
-    def getValidDirections(self):
+    def getValidDirections(self) -> Tuple[int, ...]:
         if not self.alive:
-            return [ ]
+            return ( )
         if self.isAtNode:
             return self.validDirectionsFromNode(self.node)
         if self.direction is STOP:
-            return [ ]
-        return [ self.direction, self.direction * -1 ]
-
-    def validDirectionsFromNode(self, node: Node):
-        validDirections: List[int] = []
-        for direction in [UP, DOWN, LEFT, RIGHT]:
-            if self.name in node.access[direction]:
-                if node.neighbors[direction] is not None:
-                    validDirections.append(direction)
-        return validDirections
+            return ( )
+        return ( self.direction, self.direction * -1 )
+
+    # The view is rebuilt only when Pacman has moved to another node or edge,
+    # turned, or the access rules changed (which gives new valid directions),
+    # so everything deciding on one tick shares it
+    def getView(self) -> PacmanView:
+        validDirections = self.getValidDirections()
+        key = (validDirections, self.direction, self.node, self.target, self.isAtNode)
+        if key != self.viewKey:
+            self.viewKey = key
+            self.view = PacmanView(self, validDirections)
+        return self.view
+
+    def validDirectionsFromNode(self, node: Node) -> Tuple[int, ...]:
+        return node.getValidDirections(self.name)
     
-    def getKeyboardDirection(self):
-        key_pressed = pygame.key.get_pressed()
-        if key_pressed[K_UP]:
-            return UP
-        if key_pressed[K_DOWN]:
-            return DOWN
-        if key_pressed[K_LEFT]:
-            return LEFT
-        if key_pressed[K_RIGHT]:
-            return RIGHT
-        return STOP  
-
-    def eatPellets(self, pelletList):
-        for pellet in pelletList:
-            if self.collideCheck(pellet):
-                return pellet
-        return None    
+    def eatPellets(self, pellets):
+        return pellets.getCollidingPellet(self)
     
     def collideGhost(self, ghost):
         return self.collideCheck(ghost)
 
     def collideCheck(self, other):
-        d = self.position - other.position
-        dSquared = d.magnitudeSquared()
+        dSquared = self.position.distanceSquaredTo(other.position)
         rSquared = (self.collideRadius + other.collideRadius)**2
         if dSquared <= rSquared:
             return True
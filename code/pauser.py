@@ -1,25 +1,51 @@
 class Pause(object):
-    def __init__(self, paused=False):
+    def __init__(self, paused=False, timers=None):
         self.paused = paused
-        self.timer = 0
+        self.timers = timers
+        self.timer = None
         self.pauseTime = None
         self.func = None
-        
-    def update(self, dt):
+
+    def reset(self, paused=False):
+        self.cancel()
+        self.paused = paused
+        self.pauseTime = None
+        self.func = None
+
+    # Called by the timer of a timed pause once pauseTime has passed
+    def end(self):
+        self.timer = None
+        self.paused = False
+        self.pauseTime = None
+        if self.func is not None:
+            self.func()
+
+    def cancel(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    # The callback is stored by name, so the state can be restored onto (and
+    # pickled independently of) the object owning the callback
+    def getState(self):
+        funcName = self.func.__name__ if self.func is not None else None
+        timer = self.timer.getElapsed() if self.timer is not None else 0
+        return (self.paused, timer, self.pauseTime, funcName)
+
+    def setState(self, state, owner):
+        self.cancel()
+        self.paused, timer, self.pauseTime, funcName = state
+        self.func = getattr(owner, funcName) if funcName is not None else None
         if self.pauseTime is not None:
-            self.timer += dt
-            if self.timer >= self.pauseTime:
-                self.timer = 0
-                self.paused = False
-                self.pauseTime = None
-                return self.func
-        return None
+            self.timer = self.timers.schedule(self.pauseTime, self.end, timer)
 
     def setPause(self, playerPaused=False, pauseTime=None, func=None):
-        self.timer = 0
+        self.cancel()
         self.func = func
         self.pauseTime = pauseTime
+        if pauseTime is not None:
+            self.timer = self.timers.schedule(pauseTime, self.end)
         self.flip()
 
     def flip(self):
-        self.paused = not self.paused
\ No newline at end of file
+        self.paused = not self.paused
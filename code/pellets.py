@@ -1,4 +1,6 @@
-import pygame
+import sys
+import math
+from bisect import bisect_left, bisect_right
 from vector import Vector2
 from constants import *
 import numpy as np
@@ -6,18 +8,14 @@ import numpy as np
 class Pellet(object):
     def __init__(self, row, column):
         self.name = PELLET
+        self.row = row
+        self.column = column
         self.position = Vector2(column*TILEWIDTH, row*TILEHEIGHT)
         self.color = WHITE
         self.radius = int(2 * TILEWIDTH / 16)
         self.collideRadius = 2 * TILEWIDTH / 16
         self.points = 10
         self.visible = True
-        
-    def render(self, screen):
-        if self.visible:
-            adjust = Vector2(TILEWIDTH, TILEHEIGHT) / 2
-            p = self.position + adjust
-            pygame.draw.circle(screen, self.color, p.asInt(), self.radius)
 
 
 class PowerPellet(Pellet):
@@ -27,45 +25,187 @@ class PowerPellet(Pellet):
         self.radius = int(8 * TILEWIDTH / 16)
         self.points = 50
         self.flashTime = 0.2
-        self.timer= 0
-        
-    def update(self, dt):
-        self.timer += dt
-        if self.timer >= self.flashTime:
-            self.visible = not self.visible
-            self.timer = 0
+
+    def reset(self):
+        self.visible = True
 
 
 class PelletGroup(object):
     def __init__(self, pelletfile):
-        self.pelletList = []
+        self.allPellets = []
         self.powerpellets = []
         self.createPelletList(pelletfile)
+        self.setupRemaining()
+        self.numEaten = 0
+        self.flashTimer = None
+
+    @classmethod
+    def fromCompiledMaze(cls, maze):
+        pellets = cls.__new__(cls)
+        pellets.allPellets = []
+        pellets.powerpellets = []
+        for row, col, name in maze.pellets:
+            pellets.addPellet(row, col, name)
+        pellets.setupRemaining(maze)
+        pellets.numEaten = 0
+        pellets.flashTimer = None
+        return pellets
+
+    def addPellet(self, row, col, name):
+        if name == POWERPELLET:
+            pp = PowerPellet(row, col)
+            self.allPellets.append(pp)
+            self.powerpellets.append(pp)
+        else:
+            self.allPellets.append(Pellet(row, col))
+
+    # The remaining pellets are kept as a flag per index into allPellets and as
+    # an occupancy grid over the tiles, so eating, removing and finding the
+    # closest pellet don't scan a list. Bit i of remainingMask mirrors
+    # remaining[i] for snapshots.
+    def setupRemaining(self, maze=None):
+        self.allPellets = tuple(self.allPellets)
+        self.pelletX = np.array([pellet.position.x for pellet in self.allPellets], dtype=float)
+        self.pelletY = np.array([pellet.position.y for pellet in self.allPellets], dtype=float)
+        self.indexGrid = np.full((NROWS, NCOLS), -1, dtype=int)
+        for i, pellet in enumerate(self.allPellets):
+            pellet.index = i
+            self.indexGrid[pellet.row, pellet.column] = i
+        self.fullMask = (1 << len(self.allPellets)) - 1
+        self.setupEdges(maze)
+        self.resetRemaining()
+
+    # Pellets on the edges of the compiled maze (none without one), counted
+    # per edge and stored by their offset from the first node of the edge
+    def setupEdges(self, maze):
+        edges = maze.edges if maze is not None else ()
+        edgePellets = maze.edgePellets if maze is not None else ()
+        self.edgeStarts = tuple(maze.nodeKeys[first] for first, second in edges)
+        self.edgeOffsets = tuple(tuple(offset for offset, i in pellets) for pellets in edgePellets)
+        self.edgePelletIndices = tuple(tuple(i for offset, i in pellets) for pellets in edgePellets)
+        pelletEdges = [[] for pellet in self.allPellets]
+        for edge, indices in enumerate(self.edgePelletIndices):
+            for i in indices:
+                pelletEdges[i].append(edge)
+        self.pelletEdges = tuple(map(tuple, pelletEdges))
+
+    def resetRemaining(self):
+        self.remaining = np.ones(len(self.allPellets), dtype=bool)
+        self.grid = self.indexGrid >= 0
+        self.numRemaining = len(self.allPellets)
+        self.remainingMask = self.fullMask
+        self.edgeCounts = [len(indices) for indices in self.edgePelletIndices]
+
+    def getRemainingPellets(self):
+        return [pellet for pellet in self.allPellets if self.remaining[pellet.index]]
+
+    # Pellets are a tile apart and an entity collides with a pellet within
+    # less than half a tile, so only the pellet on the nearest tile can collide
+    def getCollidingPellet(self, entity):
+        row = math.floor(entity.position.y / TILEHEIGHT + 0.5)
+        col = math.floor(entity.position.x / TILEWIDTH + 0.5)
+        if 0 <= row < NROWS and 0 <= col < NCOLS and self.grid[row, col]:
+            pellet = self.allPellets[self.indexGrid[row, col]]
+            if entity.collideCheck(pellet):
+                return pellet
+        return None
+
+    # Remaining pellet with the smallest Manhattan distance to position (the
+    # first one in allPellets on ties), and the distance
+    def getClosestPellet(self, position):
+        if self.numRemaining == 0:
+            return None, sys.float_info.max
+        distances = np.abs(self.pelletX - position.x) + np.abs(self.pelletY - position.y)
+        distances[~self.remaining] = np.inf
+        i = int(distances.argmin())
+        return self.allPellets[i], float(distances[i])
+
+    def edgeHasPellet(self, edge):
+        return self.edgeCounts[edge] > 0
+
+    # Whether a remaining pellet lies on the part of the edge between position
+    # and its second node if forward is True, or its first node otherwise
+    def partialEdgeHasPellet(self, edge, position, forward):
+        if self.edgeCounts[edge] == 0:
+            return False
+        startX, startY = self.edgeStarts[edge]
+        offset = abs(position.x - startX) + abs(position.y - startY)
+        offsets = self.edgeOffsets[edge]
+        indices = self.edgePelletIndices[edge]
+        if forward:
+            indices = indices[bisect_left(offsets, offset):]
+        else:
+            indices = indices[:bisect_right(offsets, offset)]
+        remaining = self.remaining
+        return any(remaining[i] for i in indices)
+
+    def removePellet(self, pellet):
+        self.remaining[pellet.index] = False
+        self.grid[pellet.row, pellet.column] = False
+        self.numRemaining -= 1
+        self.remainingMask &= ~(1 << pellet.index)
+        for edge in self.pelletEdges[pellet.index]:
+            self.edgeCounts[edge] -= 1
+
+    def restoreRemaining(self, mask):
+        if mask != self.remainingMask:
+            for pellet in self.allPellets:
+                isRemaining = bool(mask >> pellet.index & 1)
+                self.remaining[pellet.index] = isRemaining
+                self.grid[pellet.row, pellet.column] = isRemaining
+            self.numRemaining = int(self.remaining.sum())
+            self.remainingMask = mask
+            self.edgeCounts = [int(self.remaining[list(indices)].sum()) for indices in self.edgePelletIndices]
+
+    def getState(self):
+        timer = self.flashTimer.getElapsed() if self.flashTimer is not None else 0
+        return (self.remainingMask, self.numEaten, 
+                tuple((pp.visible, timer) for pp in self.powerpellets))
+
+    def setState(self, state):
+        mask, self.numEaten, powerpellets = state
+        self.restoreRemaining(mask)
+        for pp, (visible, timer) in zip(self.powerpellets, powerpellets):
+            pp.visible = visible
+        if self.flashTimer is not None and len(powerpellets) > 0:
+            self.startFlashing(self.flashTimer.scheduler, powerpellets[0][1])
+
+    def reset(self):
+        self.resetRemaining()
+        for powerpellet in self.powerpellets:
+            powerpellet.reset()
         self.numEaten = 0
+        if self.flashTimer is not None:
+            self.startFlashing(self.flashTimer.scheduler)
+
+    # The power pellets flash in step on a timer, which is only started when
+    # the pellets are rendered
+    def startFlashing(self, timers, elapsed=0):
+        self.stopFlashing()
+        if len(self.powerpellets) > 0:
+            self.flashTimer = timers.schedule(self.powerpellets[0].flashTime, self.flash, elapsed)
 
-    def update(self, dt):
+    def stopFlashing(self):
+        if self.flashTimer is not None:
+            self.flashTimer.cancel()
+            self.flashTimer = None
+
+    def flash(self):
         for powerpellet in self.powerpellets:
-            powerpellet.update(dt)
+            powerpellet.visible = not powerpellet.visible
+        self.flashTimer = self.flashTimer.scheduler.schedule(self.powerpellets[0].flashTime, self.flash)
                 
     def createPelletList(self, pelletfile):
         data = self.readPelletfile(pelletfile)        
         for row in range(data.shape[0]):
             for col in range(data.shape[1]):
                 if data[row][col] in ['.', '+']:
-                    self.pelletList.append(Pellet(row, col))
+                    self.addPellet(row, col, PELLET)
                 elif data[row][col] in ['P', 'p']:
-                    pp = PowerPellet(row, col)
-                    self.pelletList.append(pp)
-                    self.powerpellets.append(pp)
+                    self.addPellet(row, col, POWERPELLET)
                     
     def readPelletfile(self, textfile):
         return np.loadtxt(textfile, dtype='<U1')
     
     def isEmpty(self):
-        if len(self.pelletList) == 0:
-            return True
-        return False
-    
-    def render(self, screen):
-        for pellet in self.pelletList:
-            pellet.render(screen)
\ No newline at end of file
+        return self.numRemaining == 0
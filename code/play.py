@@ -7,14 +7,14 @@ from state import *
 
 if __name__ == "__main__":
     
-    player = Player("Demo", "", exploration_rho=0, lr_alpha=0)
+    player = Player("Demo", "", exploration_rho=0, lr_alpha=0, dense=True)
 
     if len(sys.argv) == 2:
         print(f"Loading policy from command line: '{sys.argv[1]}'")
         player.loadPolicy(sys.argv[1])            
     
     else:
-        policies = sorted(glob.glob("policies/temp/policy-*"), key=str.upper)
+        policies = sorted(glob.glob("policies/temp/policy-*[0-9]"), key=str.upper)
         assert len(policies) > 0
 
         print(f"Loading latest policy: '{policies[-1]}'")
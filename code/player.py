@@ -2,22 +2,28 @@ import pickle
 from typing import Callable, List
 import numpy as np
 import random 
-from Counter import Counter
-from run import GameController
+from qtable import CounterQTable, DenseQTable
+from policyfile import applyDeltas, isBinaryPolicy, readPolicy
+from checkpointer import PolicyCheckpointer
+from state_encoding import convertPolicy
 
 
 class Player:
 
-    def __init__(self, name, policy_name: str, exploration_rho=0.3, lr_alpha=0.2, discount_rate_gamma=0.9, walk_len_nu=0.2):
+    # With dense the Q-table is a DenseQTable instead of a CounterQTable, and
+    # checkpointDeltas is the numDeltas of the PolicyCheckpointer
+    def __init__(self, name, policy_name: str, exploration_rho=0.3, lr_alpha=0.2, discount_rate_gamma=0.9, walk_len_nu=0.2, dense=False, checkpointDeltas=0):
         self.name = name
         self.exploration_rho = exploration_rho
         self.lr_alpha = lr_alpha
         self.discount_rate_gamma = discount_rate_gamma
         self.walk_len_nu = walk_len_nu
         self.policy_name = policy_name
+        self.qTableType = DenseQTable if dense else CounterQTable
+        self.checkpointer = PolicyCheckpointer(checkpointDeltas)
                 
         # Q-table
-        self.states_value = Counter()  # state -> value
+        self.states_value = self.qTableType()
         
         # current score
         self.old_score = 0
@@ -33,30 +39,20 @@ class Player:
 
     # Get Q(s,a).
     def getQValue(self, state, action):
-        return self.states_value[str([state,action])]
+        return self.states_value.getQValue(state, action)
 
     # Return the maximum Q value of a given state.
     def getMaxQ(self, state, possible_directions):
-        q_list = []
-        for action in possible_directions:
-            q = self.getQValue(state,action)
-            q_list.append(q)
-        if len(q_list) ==0:
-            return 0
-        return max(q_list)
+        return self.states_value.getMaxQ(state, possible_directions)
 
     # update Q value
     def updateQ(self, state, action, reward, qmax):
         q = self.getQValue(state,action)
-        self.states_value[str([state,action])] = (1 - self.lr_alpha)*q + self.lr_alpha*(reward + self.discount_rate_gamma*qmax - q)
+        self.states_value.setQValue(state, action, (1 - self.lr_alpha)*q + self.lr_alpha*(reward + self.discount_rate_gamma*qmax - q))
     
     # Return the action that maximises Q of state.
     def takeBestAction(self, state, possible_directions):
-        tmp = Counter()
-        for action in possible_directions:
-          tmp[action] = self.getQValue(state, action)
-        # print(tmp)
-        return tmp.argMax()
+        return self.states_value.getBestAction(state, possible_directions)
     
 
     def updateQValueOfLastState(self, state, reward, possible_directions):
@@ -95,17 +91,31 @@ class Player:
         self.lastState = []
         self.lastAction = []
 
-    # Saves the Q-table.
-    def savePolicy(self):
+    # Saves a checkpoint of the Q-table in the background (see PolicyCheckpointer).
+    def checkpointPolicy(self):
         assert self.policy_name is not None and len(self.policy_name) > 0
-        fw = open(self.policy_name, 'wb')
-        pickle.dump(self.states_value, fw)
-        pickle.dump(self.numIterations, fw)
-        fw.close()
+        self.checkpointer.checkpoint(self.policy_name, self.states_value, self.numIterations,
+            (self.exploration_rho, self.lr_alpha, self.discount_rate_gamma, self.walk_len_nu))
 
-    # Loads a Q-table.
+    # Saves the whole Q-table as a binary policy (see policyfile), and waits
+    # for it to be written.
+    def savePolicy(self):
+        self.checkpointer.reset()
+        self.checkpointPolicy()
+        self.checkpointer.wait()
+
+    # Loads a Q-table. A binary policy is memory-mapped by a dense player (and
+    # copied into the Counter of any other), with its delta log applied.
+    # Pickled policies saved with state strings are converted to integer keys
+    # (which convertpolicy.py does once for the file).
     def loadPolicy(self, file: str):
+        self.checkpointer.reset()
+        if isBinaryPolicy(file):
+            table, header = readPolicy(file)
+            self.numIterations = applyDeltas(file, table, header.numIterations)
+            self.states_value = table if self.qTableType is DenseQTable else self.qTableType(table.toCounter())
+            return
         fr = open(file, 'rb')
-        self.states_value = pickle.load(fr)
+        self.states_value = self.qTableType(convertPolicy(pickle.load(fr)))
         self.numIterations = pickle.load(fr)
-        fr.close()
\ No newline at end of file
+        fr.close()
@@ -0,0 +1,130 @@
+import os
+import struct
+from typing import List, NamedTuple, Tuple
+import numpy as np
+from qtable import DenseQTable
+from state_encoding import NUMACTIONS, NUMSTATES, STATEENCODINGVERSION
+
+# Binary policies are a header followed by the Q-values of a DenseQTable as
+# float32[numStates, numActions] and its visited entries as
+# uint8[numStates, numActions], both in C order. The header is the magic,
+# the version of the format, STATEENCODINGVERSION, numStates, numActions,
+# the number of iterations and the hyperparameters of the player that saved
+# it (NaN if unknown), little endian and padded to HEADERSIZE bytes.
+MAGIC = b"PACQ"
+FORMATVERSION = 1
+HEADERFORMAT = "<4sIIIIQdddd"
+HEADERSIZE = 64
+
+# The delta log of a policy (its file name + DELTALOGSUFFIX) holds the
+# Q-values changed after the policy was written, as records of a header
+# (DELTAMAGIC, the number of iterations and the number of entries) followed by
+# the (Q-table key, value) of every entry
+DELTALOGSUFFIX = ".log"
+DELTAMAGIC = b"PACD"
+DELTAHEADERFORMAT = "<4sQI"
+DELTAENTRY = np.dtype([("key", "<u4"), ("value", "<f4")])
+
+
+class PolicyHeader(NamedTuple):
+    formatVersion: int
+    stateEncodingVersion: int
+    numStates: int
+    numActions: int
+    numIterations: int
+    exploration_rho: float
+    lr_alpha: float
+    discount_rate_gamma: float
+    walk_len_nu: float
+
+
+def isBinaryPolicy(file: str) -> bool:
+    with open(file, 'rb') as fr:
+        return fr.read(len(MAGIC)) == MAGIC
+
+
+def writePolicy(file: str, table: DenseQTable, numIterations: int,
+                exploration_rho=float("nan"), lr_alpha=float("nan"),
+                discount_rate_gamma=float("nan"), walk_len_nu=float("nan")):
+    header = struct.pack(HEADERFORMAT, MAGIC, FORMATVERSION, STATEENCODINGVERSION, NUMSTATES, NUMACTIONS,
+                         numIterations, exploration_rho, lr_alpha, discount_rate_gamma, walk_len_nu)
+    # Written to a temporary file which replaces the policy, so a crash never
+    # leaves a partly written policy, and processes that have the old policy
+    # memory-mapped keep reading it
+    temp = file + ".tmp"
+    with open(temp, 'wb') as fw:
+        fw.write(header.ljust(HEADERSIZE, b"\0"))
+        fw.write(np.ascontiguousarray(table.values, dtype=np.float32).tobytes())
+        fw.write(np.ascontiguousarray(table.visited, dtype=np.uint8).tobytes())
+        fw.flush()
+        os.fsync(fw.fileno())
+    os.replace(temp, file)
+
+
+def readHeader(file: str) -> PolicyHeader:
+    with open(file, 'rb') as fr:
+        data = fr.read(struct.calcsize(HEADERFORMAT))
+    magic, *fields = struct.unpack(HEADERFORMAT, data)
+    header = PolicyHeader(*fields)
+    if magic != MAGIC or header.formatVersion != FORMATVERSION:
+        raise ValueError(f"'{file}' is not a binary policy of format version {FORMATVERSION}")
+    if (header.stateEncodingVersion != STATEENCODINGVERSION
+            or header.numStates != NUMSTATES or header.numActions != NUMACTIONS):
+        raise ValueError(f"'{file}' was saved for state encoding version {header.stateEncodingVersion}, "
+                         f"not {STATEENCODINGVERSION}")
+    return header
+
+
+# The table memory-maps the file copy-on-write, so loading takes the same
+# time for any policy, processes loading the same policy share its pages,
+# and writes to the table only change the copy of the process
+def readPolicy(file: str):
+    header = readHeader(file)
+    shape = (header.numStates, header.numActions)
+    values = np.memmap(file, dtype=np.float32, mode='c', offset=HEADERSIZE, shape=shape)
+    visited = np.memmap(file, dtype=np.bool_, mode='c', offset=HEADERSIZE + values.nbytes, shape=shape)
+    return DenseQTable.fromArrays(values, visited), header
+
+
+def getDeltaLogName(file: str) -> str:
+    return file + DELTALOGSUFFIX
+
+
+def appendDeltas(file: str, numIterations: int, changes: List[Tuple[int, float]]):
+    entries = np.array(changes, dtype=DELTAENTRY)
+    with open(getDeltaLogName(file), 'ab') as fw:
+        fw.write(struct.pack(DELTAHEADERFORMAT, DELTAMAGIC, numIterations, len(entries)))
+        fw.write(entries.tobytes())
+        fw.flush()
+        os.fsync(fw.fileno())
+
+
+def removeDeltas(file: str):
+    if os.path.exists(getDeltaLogName(file)):
+        os.remove(getDeltaLogName(file))
+
+
+# Writes the records of the delta log with more iterations than the policy
+# to the table, and returns the iterations of the last of them (or those of
+# the policy). Records from before the policy was last written are skipped,
+# and a record cut short by a crash ends the log.
+def applyDeltas(file: str, table: DenseQTable, numIterations: int) -> int:
+    if not os.path.exists(getDeltaLogName(file)):
+        return numIterations
+    with open(getDeltaLogName(file), 'rb') as fr:
+        data = fr.read()
+    headerSize = struct.calcsize(DELTAHEADERFORMAT)
+    offset = 0
+    while offset + headerSize <= len(data):
+        magic, recordIterations, count = struct.unpack_from(DELTAHEADERFORMAT, data, offset)
+        offset += headerSize
+        if magic != DELTAMAGIC or offset + count * DELTAENTRY.itemsize > len(data):
+            break
+        entries = np.frombuffer(data, dtype=DELTAENTRY, count=count, offset=offset)
+        offset += count * DELTAENTRY.itemsize
+        if recordIterations > numIterations:
+            states, columns = np.divmod(entries["key"], NUMACTIONS)
+            table.values[states, columns] = entries["value"]
+            table.visited[states, columns] = True
+            numIterations = recordIterations
+    return numIterations
@@ -0,0 +1,150 @@
+from typing import Dict, Sequence
+import numpy as np
+from Counter import Counter
+from relative_direction import RelativeDirection
+from state_encoding import DIRECTIONINDEX, NUMACTIONS, NUMSTATES, encodeQKey, decodeQKey
+
+
+class CounterQTable(object):
+    """
+    Q-values in a Counter keyed by encodeQKey(state, action). Missing
+    Q-values are 0, and reading them does not add them (unlike indexing the
+    Counter), so the table only holds the Q-values that have been written.
+    """
+    def __init__(self, values: Counter = None):
+        self.values = values if values is not None else Counter()
+        self.changed = set()
+
+    def __len__(self):
+        return len(self.values)
+
+    def copy(self):
+        return CounterQTable(Counter(self.values))
+
+    # (Q-table key, value) of the entries written since the last call
+    def takeChanges(self):
+        changes = [(key, self.values[key]) for key in self.changed]
+        self.changed = set()
+        return changes
+
+    # (Q-table key, value) of every entry
+    def items(self):
+        return self.values.items()
+
+    def toCounter(self) -> Counter:
+        return self.values
+
+    def getQValue(self, state: int, action: RelativeDirection) -> float:
+        return self.values.get(encodeQKey(state, action), 0)
+
+    def setQValue(self, state: int, action: RelativeDirection, value: float):
+        key = encodeQKey(state, action)
+        self.values[key] = value
+        self.changed.add(key)
+
+    def getMaxQ(self, state: int, actions: Sequence[RelativeDirection]) -> float:
+        q_list = []
+        for action in actions:
+            q = self.getQValue(state, action)
+            q_list.append(q)
+        if len(q_list) == 0:
+            return 0
+        return max(q_list)
+
+    def getBestAction(self, state: int, actions: Sequence[RelativeDirection]) -> RelativeDirection:
+        tmp = Counter()
+        for action in actions:
+            tmp[action] = self.getQValue(state, action)
+        return tmp.argMax()
+
+
+class DenseQTable(object):
+    """
+    Q-values in a float32 array with a row per state and a column per action
+    (in the order of state_encoding.RELATIVEDIRECTIONS). The entries that
+    have been written are tracked in visited, which stands in for the keys
+    of a CounterQTable. The max and best action of a state are taken over
+    the columns of the valid actions, and ties go to the first of them like
+    in CounterQTable.
+    """
+    def __init__(self, values: Counter = None):
+        self.values = np.zeros((NUMSTATES, NUMACTIONS), dtype=np.float32)
+        self.visited = np.zeros((NUMSTATES, NUMACTIONS), dtype=bool)
+        self.columns: Dict[tuple, np.ndarray] = {}
+        self.changed = set()
+        if values is not None:
+            for key, value in values.items():
+                state, action = decodeQKey(key)
+                self.values[state, DIRECTIONINDEX[action]] = value
+                self.visited[state, DIRECTIONINDEX[action]] = True
+
+    # A table on existing arrays (such as those memory-mapped by policyfile),
+    # which are used without being copied
+    @classmethod
+    def fromArrays(cls, values: np.ndarray, visited: np.ndarray):
+        table = cls.__new__(cls)
+        table.values = values
+        table.visited = visited
+        table.columns = {}
+        table.changed = set()
+        return table
+
+    def __len__(self):
+        return int(np.count_nonzero(self.visited))
+
+    def copy(self):
+        return DenseQTable.fromArrays(np.array(self.values), np.array(self.visited))
+
+    def takeChanges(self):
+        changes = [(key, float(self.values[divmod(key, NUMACTIONS)])) for key in self.changed]
+        self.changed = set()
+        return changes
+
+    def items(self):
+        for state, column in zip(*np.nonzero(self.visited)):
+            yield int(state) * NUMACTIONS + int(column), float(self.values[state, column])
+
+    # The Counter a CounterQTable would hold, which is what policies are saved as
+    def toCounter(self) -> Counter:
+        values = Counter()
+        for key, value in self.items():
+            values[key] = value
+        return values
+
+    # Column indices of the actions, cached per list of actions
+    def getColumns(self, actions: Sequence[RelativeDirection]) -> np.ndarray:
+        key = tuple(actions)
+        columns = self.columns.get(key)
+        if columns is None:
+            columns = self.columns[key] = np.array([DIRECTIONINDEX[action] for action in key], dtype=np.intp)
+        return columns
+
+    def getQValue(self, state: int, action: RelativeDirection) -> float:
+        return float(self.values[state, DIRECTIONINDEX[action]])
+
+    def setQValue(self, state: int, action: RelativeDirection, value: float):
+        column = DIRECTIONINDEX[action]
+        self.visited[state, column] = True
+        self.values[state, column] = value
+        self.changed.add(state * NUMACTIONS + column)
+
+    def getMaxQ(self, state: int, actions: Sequence[RelativeDirection]) -> float:
+        if len(actions) == 0:
+            return 0
+        return float(self.values[state, self.getColumns(actions)].max())
+
+    def getBestAction(self, state: int, actions: Sequence[RelativeDirection]) -> RelativeDirection:
+        if len(actions) == 0:
+            return None
+        return actions[int(self.values[state, self.getColumns(actions)].argmax())]
+
+
+# The Q-values of a policy without those that are 0, which are the same as
+# missing ones. Policies saved while reading a Q-value added it are mostly
+# such entries.
+def compactPolicy(values: dict) -> Counter:
+    compacted = Counter()
+    for key, value in values.items():
+        if value != 0:
+            compacted[key] = value
+    return compacted
@@ -0,0 +1,241 @@
+import pygame
+from pygame.locals import *
+from vector import Vector2
+from constants import *
+from run import GameController, FRAMERATE
+from text import TextGroup
+from sprites import PacmanSprites, GhostSprites, FruitSprites, LifeSprites, MazeSprites
+
+
+class RenderedGameController(GameController):
+
+    def __init__(self):
+        GameController.__init__(self)
+        # The game waits for the player (SPACE) before it starts
+        self.pause.paused = True
+        pygame.init()
+        self.screen = pygame.display.set_mode(SCREENSIZE, 0, 32)
+        self.background = None
+        self.background_norm = None
+        self.background_flash = None
+        self.clock = pygame.time.Clock()
+        self.textgroup = TextGroup(self.timers)
+        self.lifesprites = LifeSprites(self.lives)
+        self.flashTime = 0.2
+        self.flashTimer = None
+        self.fruitCaptured = []
+
+    def setBackground(self):
+        self.background_norm = pygame.surface.Surface(SCREENSIZE).convert()
+        self.background_norm.fill(BLACK)
+        self.background_flash = pygame.surface.Surface(SCREENSIZE).convert()
+        self.background_flash.fill(BLACK)
+        self.background_norm = self.mazesprites.constructBackground(self.background_norm, self.level%5)
+        self.background_flash = self.mazesprites.constructBackground(self.background_flash, 5)
+        self.flashBG = False
+        self.stopFlashBackground()
+        self.background = self.background_norm
+
+    def startGame(self):
+        if hasattr(self, "pellets"):
+            self.pellets.stopFlashing()
+        GameController.startGame(self)
+        self.pellets.startFlashing(self.timers)
+        self.mazesprites = MazeSprites(self.compiledMaze.data, self.compiledMaze.rotdata)
+        self.setBackground()
+        self.pacman.sprites = PacmanSprites(self.pacman)
+        for ghost in self.ghosts:
+            ghost.sprites = GhostSprites(ghost)
+
+    def update(self):
+        dt = self.clock.tick(FRAMERATE) / 1000.0
+        if dt > 1 / FRAMERATE: dt = 1 / FRAMERATE
+
+        self.updateEntities(dt)
+        self.updateSprites(dt)
+        # Timers count frames, whatever their dt
+        self.timers.update()
+        self.checkEvents()
+        self.render()
+
+    def updateSprites(self, dt):
+        if not self.pacman.alive or not self.pause.paused:
+            self.pacman.sprites.update(dt)
+        if not self.pause.paused:
+            for ghost in self.ghosts:
+                ghost.sprites.update(dt)
+
+    def checkEvents(self):
+        for event in pygame.event.get():
+            if event.type == QUIT:
+                exit()
+            elif event.type == KEYDOWN:
+                if event.key == K_SPACE:
+                    if self.pacman.alive:
+                        self.pause.setPause(playerPaused=True)
+                        if not self.pause.paused:
+                            self.textgroup.hideText()
+                            self.showEntities()
+                        else:
+                            self.textgroup.showText(PAUSETXT)
+                            #self.hideEntities()
+
+    def createFruit(self):
+        fruit = GameController.createFruit(self)
+        fruit.sprites = FruitSprites(fruit, self.level)
+        return fruit
+
+    def captureFruit(self, fruit):
+        for image in self.fruitCaptured:
+            if image.get_offset() == fruit.image.get_offset():
+                return
+        self.fruitCaptured.append(fruit.image)
+
+    def showText(self, id):
+        self.textgroup.showText(id)
+
+    def flashBackground(self):
+        GameController.flashBackground(self)
+        self.stopFlashBackground()
+        self.flashTimer = self.timers.schedule(self.flashTime, self.toggleBackground)
+
+    def stopFlashBackground(self):
+        if self.flashTimer is not None:
+            self.flashTimer.cancel()
+            self.flashTimer = None
+
+    def toggleBackground(self):
+        if self.background == self.background_norm:
+            self.background = self.background_flash
+        else:
+            self.background = self.background_norm
+        self.flashTimer = self.timers.schedule(self.flashTime, self.toggleBackground)
+
+    def showPoints(self, points, position):
+        self.textgroup.addText(str(points), WHITE, position.x, position.y, 8, time=1)
+
+    def updateScore(self, points):
+        GameController.updateScore(self, points)
+        self.textgroup.updateScore(self.score)
+
+    def loseLife(self):
+        GameController.loseLife(self)
+        self.lifesprites.removeImage()
+
+    # Pauses on Pacman dying (and on the game being lost), before continuing
+    # with the next life or a new game
+    def pacmanDied(self):
+        if self.lives <= 0:
+            self.showText(GAMEOVERTXT)
+            self.pause.setPause(pauseTime=3, func=self.restartGame)
+        else:
+            self.pause.setPause(pauseTime=3, func=self.resetLevel)
+
+    def levelCleared(self):
+        self.flashBackground()
+        self.hideEntities()
+        self.pause.setPause(pauseTime=3, func=self.nextLevel)
+
+    def ghostEaten(self, ghost):
+        self.pause.setPause(pauseTime=1, func=self.showEntities)
+
+    def nextLevel(self):
+        GameController.nextLevel(self)
+        self.pause.paused = True
+        self.textgroup.updateLevel(self.level)
+
+    def restartGame(self):
+        GameController.restartGame(self)
+        self.pause.paused = True
+        self.textgroup.updateScore(self.score)
+        self.textgroup.updateLevel(self.level)
+        self.lifesprites.resetLives(self.lives)
+        self.fruitCaptured = []
+
+    def resetEpisode(self):
+        GameController.resetEpisode(self)
+        self.pause.paused = True
+        self.textgroup.updateScore(self.score)
+        self.textgroup.updateLevel(self.level)
+        self.textgroup.showText(READYTXT)
+        self.lifesprites.resetLives(self.lives)
+        self.fruitCaptured = []
+        self.stopFlashBackground()
+        self.background = self.background_norm
+        self.pacman.image = self.pacman.sprites.getStartImage()
+        self.pacman.sprites.reset()
+        for ghost in self.ghosts:
+            ghost.image = ghost.sprites.getStartImage()
+
+    def restore(self, snap):
+        GameController.restore(self, snap)
+        self.textgroup.updateScore(self.score)
+        self.textgroup.updateLevel(self.level)
+        self.lifesprites.resetLives(self.lives)
+
+    def resetLevel(self):
+        GameController.resetLevel(self)
+        self.pause.paused = True
+        self.showText(READYTXT)
+        self.pacman.image = self.pacman.sprites.getStartImage()
+        self.pacman.sprites.reset()
+
+    def render(self):
+        self.screen.blit(self.background, (0, 0))
+        #renderNodes(self.screen, self.nodes)
+        for pellet in self.pellets.getRemainingPellets():
+            renderPellet(self.screen, pellet)
+        if self.fruit is not None:
+            renderEntity(self.screen, self.fruit)
+        renderEntity(self.screen, self.pacman)
+        for ghost in self.ghosts:
+            renderEntity(self.screen, ghost)
+        self.textgroup.render(self.screen)
+
+        for i in range(len(self.lifesprites.images)):
+            x = self.lifesprites.images[i].get_width() * i
+            y = SCREENHEIGHT - self.lifesprites.images[i].get_height()
+            self.screen.blit(self.lifesprites.images[i], (x, y))
+
+        for i in range(len(self.fruitCaptured)):
+            x = SCREENWIDTH - self.fruitCaptured[i].get_width() * (i+1)
+            y = SCREENHEIGHT - self.fruitCaptured[i].get_height()
+            self.screen.blit(self.fruitCaptured[i], (x, y))
+
+        pygame.display.update()
+
+
+def renderEntity(screen, entity):
+    if entity.visible:
+        if entity.image is not None:
+            adjust = Vector2(TILEWIDTH, TILEHEIGHT) / 2
+            p = entity.position - adjust
+            screen.blit(entity.image, p.asTuple())
+        else:
+            p = entity.position.asInt()
+            pygame.draw.circle(screen, entity.color, p, entity.radius)
+
+
+def renderPellet(screen, pellet):
+    if pellet.visible:
+        adjust = Vector2(TILEWIDTH, TILEHEIGHT) / 2
+        p = pellet.position + adjust
+        pygame.draw.circle(screen, pellet.color, p.asInt(), pellet.radius)
+
+
+def renderNodes(screen, nodes):
+    for i, neighbors in enumerate(nodes.neighborTable.tolist()):
+        for neighbor in neighbors:
+            if neighbor >= 0:
+                line_start = nodes.nodeKeys[i]
+                line_end = nodes.nodeKeys[neighbor]
+                pygame.draw.line(screen, WHITE, line_start, line_end, 4)
+                pygame.draw.circle(screen, RED, line_start, 12)
+
+
+if __name__ == "__main__":
+    game = RenderedGameController()
+    game.startGame()
+    game.update()
+    while True:
+        game.update()
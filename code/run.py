@@ -1,6 +1,4 @@
 from vector import Vector2
-import pygame
-from pygame.locals import *
 from constants import *
 from pacman import Pacman
 from nodes import NodeGroup
@@ -8,35 +6,30 @@ from pellets import PelletGroup
 from ghosts import GhostGroup
 from fruit import Fruit
 from pauser import Pause
-from text import TextGroup
-from sprites import LifeSprites
-from sprites import MazeSprites
+from scheduler import Scheduler
 from mazes import MazeController
 from mazedata import MazeData######
+from mazecompiler import getCompiledMaze
+from snapshot import GameSnapshot
 
 FRAMERATE = 10
 
+# Headless game simulation - does not depend on pygame. Rendering is layered
+# on top by RenderedGameController in renderer.py.
 class GameController(object):
 
-    def __init__(self, skipRender: bool):
-        pygame.init()
-        self.skipRender = skipRender
-        self.screen = pygame.display.set_mode(SCREENSIZE, 0, 32)
-        self.background = None
-        self.background_norm = None
-        self.background_flash = None
-        self.clock = pygame.time.Clock()
+    def __init__(self):
         self.fruit = None
-        self.pause = Pause(not self.skipRender)
+        # Pauses and cosmetic timers run on timers, which only the rendered
+        # controller updates, and the fruit on gameTimers, which stand still
+        # while the game is paused
+        self.timers = Scheduler(1 / FRAMERATE)
+        self.gameTimers = Scheduler(1 / FRAMERATE)
+        self.pause = Pause(False, self.timers)
         self.level = 0
         self.lives = 5
         self.score = 0
-        self.textgroup = TextGroup()
-        self.lifesprites = LifeSprites(self.lives)
         self.flashBG = False
-        self.flashTime = 0.2
-        self.flashTimer = 0
-        self.fruitCaptured = []
         self.fruitNode = None
         self.maze = MazeController()
         self.mazedata = MazeData()######
@@ -46,29 +39,16 @@ class GameController(object):
         self.levelWon = False
         self.levelLost = False
 
-    def setBackground(self):
-        self.background_norm = pygame.surface.Surface(SCREENSIZE).convert()
-        self.background_norm.fill(BLACK)
-        self.background_flash = pygame.surface.Surface(SCREENSIZE).convert()
-        self.background_flash.fill(BLACK)
-        self.background_norm = self.mazesprites.constructBackground(self.background_norm, self.level%5)
-        self.background_flash = self.mazesprites.constructBackground(self.background_flash, 5)
-        self.flashBG = False
-        self.background = self.background_norm
-
     def startGame(self):      
         self.levelLost = False
         self.levelWon = False
         self.killingGhost = None
 
         self.mazedata.loadMaze(self.level)
-        self.mazesprites = MazeSprites(self.mazedata.obj.name+".txt", self.mazedata.obj.name+"_rotation.txt")
-        self.setBackground()
-        self.nodes = NodeGroup(self.mazedata.obj.name+".txt")
-        self.mazedata.obj.setPortalPairs(self.nodes)
-        self.mazedata.obj.connectHomeNodes(self.nodes)
+        self.compiledMaze = getCompiledMaze(self.mazedata.obj)
+        self.nodes = NodeGroup.fromCompiledMaze(self.compiledMaze)
         self.pacman = Pacman(self.nodes.getNodeFromTiles(*self.mazedata.obj.pacmanStart))
-        self.pellets = PelletGroup(self.mazedata.obj.name+".txt")
+        self.pellets = PelletGroup.fromCompiledMaze(self.compiledMaze)
         self.ghosts = GhostGroup(self.nodes.getStartTempNode(), self.pacman)
 
         self.ghosts.pinky.setStartNode(self.nodes.getNodeFromTiles(*self.mazedata.obj.addOffset(2, 3)))
@@ -76,105 +56,139 @@ class GameController(object):
         self.ghosts.clyde.setStartNode(self.nodes.getNodeFromTiles(*self.mazedata.obj.addOffset(4, 3)))
         self.ghosts.setSpawnNode(self.nodes.getNodeFromTiles(*self.mazedata.obj.addOffset(2, 3)))
         self.ghosts.blinky.setStartNode(self.nodes.getNodeFromTiles(*self.mazedata.obj.addOffset(2, 0)))
+        # Access rules are already applied by the compiled maze (see compileMaze)
 
-        self.nodes.denyHomeAccess(self.pacman)
-        self.nodes.denyHomeAccessList(self.ghosts)
-        self.ghosts.inky.startNode.denyAccess(RIGHT, self.ghosts.inky)
-        self.ghosts.clyde.startNode.denyAccess(LEFT, self.ghosts.clyde)
-        self.mazedata.obj.denyGhostsAccess(self.ghosts, self.nodes)
-
-    def startGame_old(self):      
-        self.mazedata.loadMaze(self.level)#######
-        self.mazesprites = MazeSprites("maze1.txt", "maze1_rotation.txt")
-        self.setBackground()
-        self.nodes = NodeGroup("maze1.txt")
-        self.nodes.setPortalPair((0,17), (27,17))
-        homekey = self.nodes.createHomeNodes(11.5, 14)
-        self.nodes.connectHomeNodes(homekey, (12,14), LEFT)
-        self.nodes.connectHomeNodes(homekey, (15,14), RIGHT)
-        self.pacman = Pacman(self.nodes.getNodeFromTiles(15, 26))
-        self.pellets = PelletGroup("maze1.txt")
-        self.ghosts = GhostGroup(self.nodes.getStartTempNode(), self.pacman)
-        self.ghosts.blinky.setStartNode(self.nodes.getNodeFromTiles(2+11.5, 0+14))
-        self.ghosts.pinky.setStartNode(self.nodes.getNodeFromTiles(2+11.5, 3+14))
-        self.ghosts.inky.setStartNode(self.nodes.getNodeFromTiles(0+11.5, 3+14))
-        self.ghosts.clyde.setStartNode(self.nodes.getNodeFromTiles(4+11.5, 3+14))
-        self.ghosts.setSpawnNode(self.nodes.getNodeFromTiles(2+11.5, 3+14))
-
-        self.nodes.denyHomeAccess(self.pacman)
-        self.nodes.denyHomeAccessList(self.ghosts)
-        self.nodes.denyAccessList(2+11.5, 3+14, LEFT, self.ghosts)
-        self.nodes.denyAccessList(2+11.5, 3+14, RIGHT, self.ghosts)
-        self.ghosts.inky.startNode.denyAccess(RIGHT, self.ghosts.inky)
-        self.ghosts.clyde.startNode.denyAccess(LEFT, self.ghosts.clyde)
-        self.nodes.denyAccessList(12, 14, UP, self.ghosts)
-        self.nodes.denyAccessList(15, 14, UP, self.ghosts)
-        self.nodes.denyAccessList(12, 26, UP, self.ghosts)
-        self.nodes.denyAccessList(15, 26, UP, self.ghosts)
-
-        
+    # Restores the state of a freshly constructed and started controller, reusing
+    # the nodes, pellets and entities of the current level if it is the first one
+    def resetEpisode(self):
+        self.pause.reset()
+        self.gameTimers.clear()
+        self.lives = 5
+        self.score = 0
+        self.flashBG = False
+        self.fruit = None
+        self.ghostsKilled = 0
+        self.killingGhost = None
+        self.levelWon = False
+        self.levelLost = False
 
-    def update(self):
+        if self.level != 0 or not hasattr(self, "nodes"):
+            self.level = 0
+            self.startGame()
+            return
 
-        dt = (
-            1 / FRAMERATE # 30frames per second
-            if self.skipRender else
-            self.clock.tick(FRAMERATE) / 1000.0 
-        )
+        self.nodes.resetAccess(self.compiledMaze)
+        self.pellets.reset()
+        self.pacman.reset()
+        self.ghosts.resetEpisode()
+
+    def snapshot(self) -> GameSnapshot:
+        nodes = self.nodes
+        ghosts = self.ghosts.ghosts
+        return GameSnapshot(
+            self.level, self.lives, self.score, self.ghostsKilled,
+            ghosts.index(self.killingGhost) if self.killingGhost is not None else None,
+            self.levelWon, self.levelLost, self.flashBG,
+            self.pause.getState(),
+            nodes.getAccessState(),
+            self.pellets.getState(),
+            self.pacman.getState(nodes),
+            tuple(ghost.getState(nodes) for ghost in ghosts),
+            self.ghosts.mainmode.getState(),
+            self.fruit.getState(nodes) if self.fruit is not None else None)
+
+    # Snapshots can be restored onto any controller, but the nodes, pellets
+    # and entities are only rebuilt if the snapshot is of another level
+    def restore(self, snap: GameSnapshot):
+        if snap.level != self.level or not hasattr(self, "nodes"):
+            self.level = snap.level
+            self.startGame()
+
+        self.lives = snap.lives
+        self.score = snap.score
+        self.ghostsKilled = snap.ghostsKilled
+        self.levelWon = snap.levelWon
+        self.levelLost = snap.levelLost
+        self.flashBG = snap.flashBG
+        self.pause.setState(snap.pause, self)
+        self.gameTimers.clear()
+
+        nodes = self.nodes
+        nodes.setAccessState(snap.access)
+        self.pellets.setState(snap.pellets)
+        self.pacman.setState(snap.pacman, nodes)
+        self.ghosts.mainmode.setState(snap.mainMode)
+        for ghost, ghostState in zip(self.ghosts, snap.ghosts):
+            ghost.setState(ghostState, nodes)
+        self.killingGhost = self.ghosts.ghosts[snap.killingGhost] if snap.killingGhost is not None else None
+
+        if snap.fruit is None:
+            self.fruit = None
+        else:
+            if self.fruit is None:
+                self.fruit = self.createFruit()
+            self.fruit.setState(snap.fruit, nodes)
 
-        if dt > 1 / FRAMERATE: dt = 1 / FRAMERATE
-        
+    def update(self):
+        self.updateEntities(1 / FRAMERATE)
+
+    # Macro step: updates until the next frame with a decision event (Pacman
+    # at a node, death, end of the level, a pellet, ghost or fruit event or a
+    # ghost mode change), or until maxFrames frames have passed. Returns the
+    # number of frames and Pacman's direction before the last of them.
+    #
+    # Ghosts only enter FREIGHT or SPAWN when the score changes, and timed
+    # mode changes (the scatter/chase phase or FREIGHT ending) can not happen
+    # before GhostGroup.getTimeToModeChange has passed, so the ghost modes are
+    # only compared from the frame before then. Ghosts leave SPAWN when they
+    # reach the spawn node, so those in SPAWN are checked on every frame.
+    def updateUntilEvent(self, maxFrames=None):
+        pacman = self.pacman
+        ghosts = self.ghosts.ghosts
+        dt = 1 / FRAMERATE
+        timeToModeChange = self.ghosts.getTimeToModeChange()
+        spawning = [ghost for ghost in ghosts if ghost.mode.current is SPAWN]
+        numFrames = 0
+        time = 0
+        while True:
+            direction = pacman.direction
+            score = self.score
+            fruit = self.fruit
+            time += dt
+            modes = None
+            if timeToModeChange is not None and time >= timeToModeChange - dt:
+                modes = [ghost.mode.current for ghost in ghosts]
+            self.update()
+            numFrames += 1
+
+            if pacman.isAtNode or not pacman.alive or self.levelWon or self.levelLost:
+                break
+            if self.score != score or self.fruit is not fruit:
+                break
+            if modes is not None and any(ghost.mode.current != mode for ghost, mode in zip(ghosts, modes)):
+                break
+            if any(ghost.mode.current is not SPAWN for ghost in spawning):
+                break
+            if maxFrames is not None and numFrames >= maxFrames:
+                break
+        return numFrames, direction
+
+    def updateEntities(self, dt):
         if self.pacman.alive:
             if not self.pause.paused:
                 self.pacman.update(dt)
         else:
             self.pacman.update(dt)
 
-        self.textgroup.update(dt)
-        self.pellets.update(dt)
         if not self.pause.paused:
             self.ghosts.update(dt)      
-            if self.fruit is not None:
-                self.fruit.update(dt)
+            self.gameTimers.update()
             self.checkPelletEvents()
             self.checkGhostEvents()
             self.checkFruitEvents()
 
-        if self.flashBG:
-            self.flashTimer += dt
-            if self.flashTimer >= self.flashTime:
-                self.flashTimer = 0
-                if self.background == self.background_norm:
-                    self.background = self.background_flash
-                else:
-                    self.background = self.background_norm
-
-        if not self.skipRender:
-            afterPauseMethod = self.pause.update(dt)
-            if afterPauseMethod is not None:
-                afterPauseMethod()
-        self.checkEvents()
-
-        if not self.skipRender:
-            self.render()
-
-    def checkEvents(self):
-        for event in pygame.event.get():
-            if event.type == QUIT:
-                exit()
-            elif event.type == KEYDOWN:
-                if event.key == K_SPACE and not self.skipRender:
-                    if self.pacman.alive:
-                        self.pause.setPause(playerPaused=True)
-                        if not self.pause.paused:
-                            self.textgroup.hideText()
-                            self.showEntities()
-                        else:
-                            self.textgroup.showText(PAUSETXT)
-                            #self.hideEntities()
-
     def checkPelletEvents(self):
-        pellet = self.pacman.eatPellets(self.pellets.pelletList)
+        pellet = self.pacman.eatPellets(self.pellets)
         if pellet:
             self.pellets.numEaten += 1
             self.updateScore(pellet.points)
@@ -182,16 +196,12 @@ class GameController(object):
                 self.ghosts.inky.startNode.allowAccess(RIGHT, self.ghosts.inky)
             if self.pellets.numEaten == 70:
                 self.ghosts.clyde.startNode.allowAccess(LEFT, self.ghosts.clyde)
-            self.pellets.pelletList.remove(pellet)
+            self.pellets.removePellet(pellet)
             if pellet.name == POWERPELLET:
                 self.ghosts.startFreight()
             if self.pellets.isEmpty():
                 self.levelWon = True
-                
-                if not self.skipRender:
-                    self.flashBG = True
-                    self.hideEntities()
-                    self.pause.setPause(pauseTime=3, func=self.nextLevel)
+                self.levelCleared()
 
     def checkGhostEvents(self):
         for ghost in self.ghosts:
@@ -201,51 +211,36 @@ class GameController(object):
                     ghost.visible = False
                     self.updateScore(ghost.points)
                     self.ghostsKilled += 1
-                    self.textgroup.addText(str(ghost.points), WHITE, ghost.position.x, ghost.position.y, 8, time=1)
+                    self.showPoints(ghost.points, ghost.position)
                     self.ghosts.updatePoints()
-                    if not self.skipRender:
-                        self.pause.setPause(pauseTime=1, func=self.showEntities)
+                    self.ghostEaten(ghost)
                     ghost.startSpawn()
                     self.nodes.allowHomeAccess(ghost)
                 elif ghost.mode.current is not SPAWN:
                     if self.pacman.alive:
-                        self.lives -=  1
-                        self.lifesprites.removeImage()
+                        self.loseLife()
                         self.pacman.die()               
                         self.ghosts.hide()
                         self.killingGhost = ghost
-                        
-                        if self.skipRender:
-                            if self.lives <= 0:
-                                self.levelLost = True
-                        else:
-                            if self.lives <= 0:
-                                self.textgroup.showText(GAMEOVERTXT)
-                                self.pause.setPause(pauseTime=3, func=self.restartGame)
-                            else:
-                                self.pause.setPause(pauseTime=3, func=self.resetLevel)
+                        self.pacmanDied()
                         return
     
     def checkFruitEvents(self):
         if self.pellets.numEaten == 50 or self.pellets.numEaten == 140:
             if self.fruit is None:
-                self.fruit = Fruit(self.nodes.getNodeFromTiles(9, 20), self.level)
-                #print(self.fruit)
+                self.fruit = self.createFruit()
         if self.fruit is not None:
             if self.pacman.collideCheck(self.fruit):
                 self.updateScore(self.fruit.points)
-                self.textgroup.addText(str(self.fruit.points), WHITE, self.fruit.position.x, self.fruit.position.y, 8, time=1)
-                fruitCaptured = False
-                for fruit in self.fruitCaptured:
-                    if fruit.get_offset() == self.fruit.image.get_offset():
-                        fruitCaptured = True
-                        break
-                if not fruitCaptured:
-                    self.fruitCaptured.append(self.fruit.image)
+                self.showPoints(self.fruit.points, self.fruit.position)
+                self.captureFruit(self.fruit)
                 self.fruit = None
             elif self.fruit.destroy:
                 self.fruit = None
 
+    def createFruit(self):
+        return Fruit(self.nodes.getNodeFromTiles(9, 20), self.gameTimers, self.level)
+
     def showEntities(self):
         self.pacman.visible = True
         self.ghosts.show()
@@ -257,22 +252,15 @@ class GameController(object):
     def nextLevel(self):
         self.showEntities()
         self.level += 1
-        self.pause.paused = True
         self.startGame()
-        self.textgroup.updateLevel(self.level)
 
     def restartGame(self):
         self.lives = 5
         self.level = 0
-        self.pause.paused = True
         self.fruit = None
         self.startGame()
         self.score = 0
-        self.textgroup.updateScore(self.score)
-        self.textgroup.updateLevel(self.level)
-        self.textgroup.showText(READYTXT)
-        self.lifesprites.resetLives(self.lives)
-        self.fruitCaptured = []
+        self.showText(READYTXT)
         self.levelLost = False
         self.levelWon = False
         self.killingGhost = None
@@ -283,40 +271,36 @@ class GameController(object):
         self.fruit = None
         self.killingGhost = None
 
-        if not self.skipRender:
-            self.pause.paused = True
-            self.textgroup.showText(READYTXT)
-
     def updateScore(self, points):
         self.score += points
-        self.textgroup.updateScore(self.score)
 
-    def render(self):
-        self.screen.blit(self.background, (0, 0))
-        #self.nodes.render(self.screen)
-        self.pellets.render(self.screen)
-        if self.fruit is not None:
-            self.fruit.render(self.screen)
-        self.pacman.render(self.screen)
-        self.ghosts.render(self.screen)
-        self.textgroup.render(self.screen)
-
-        for i in range(len(self.lifesprites.images)):
-            x = self.lifesprites.images[i].get_width() * i
-            y = SCREENHEIGHT - self.lifesprites.images[i].get_height()
-            self.screen.blit(self.lifesprites.images[i], (x, y))
-
-        for i in range(len(self.fruitCaptured)):
-            x = SCREENWIDTH - self.fruitCaptured[i].get_width() * (i+1)
-            y = SCREENHEIGHT - self.fruitCaptured[i].get_height()
-            self.screen.blit(self.fruitCaptured[i], (x, y))
-
-        pygame.display.update()
-
-
-if __name__ == "__main__":
-    game = GameController()
-    game.startGame()
-    game.update()
-    while True:
-        game.update()
\ No newline at end of file
+    def loseLife(self):
+        self.lives -= 1
+
+    # The headless game ends when Pacman has no lives left, and leaves
+    # continuing (with resetLevel or resetEpisode) to its caller
+    def pacmanDied(self):
+        if self.lives <= 0:
+            self.levelLost = True
+
+    # Cosmetic hooks, no-ops when running headless
+
+    def showText(self, id):
+        pass
+
+    def showPoints(self, points, position):
+        pass
+
+    def captureFruit(self, fruit):
+        pass
+
+    def flashBackground(self):
+        self.flashBG = True
+
+    # Events the rendered game pauses on, which the headless game does not
+
+    def levelCleared(self):
+        pass
+
+    def ghostEaten(self, ghost):
+        pass
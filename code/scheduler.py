@@ -0,0 +1,78 @@
+from heapq import heappush, heappop
+
+
+class Timer(object):
+    def __init__(self, scheduler, duration, callback, start):
+        self.scheduler = scheduler
+        self.duration = duration
+        self.callback = callback
+        self.start = start
+        self.cancelled = False
+
+    # Time since the timer was started, summed up dt by dt
+    def getElapsed(self):
+        return self.scheduler.getTime(self.scheduler.frame - self.start)
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Scheduler(object):
+    """
+    Timers on a clock that advances by a fixed dt per update, kept in a
+    min-heap of the frame they fire on, so an update only pays for the timers
+    that actually fire. Like the per-object timers it replaces, a timer fires
+    on the first update at which the time since it was started, summed up dt
+    by dt, is at least its duration, and its callback is called then.
+    """
+    def __init__(self, dt):
+        self.dt = dt
+        self.frame = 0
+        self.heap = []
+        self.numScheduled = 0
+        self.frameCounts = {}
+
+    # Number of updates until a timer of the duration fires
+    def getFrames(self, duration):
+        frames = self.frameCounts.get(duration)
+        if frames is None:
+            frames = 1
+            time = self.dt
+            while time < duration:
+                frames += 1
+                time += self.dt
+            self.frameCounts[duration] = frames
+        return frames
+
+    def getTime(self, frames):
+        time = 0
+        for i in range(frames):
+            time += self.dt
+        return time
+
+    # Starts a timer, which has already run for elapsed seconds if restored
+    def schedule(self, duration, callback, elapsed=0):
+        start = self.frame
+        time = 0
+        while time < elapsed:
+            time += self.dt
+            start -= 1
+        timer = Timer(self, duration, callback, start)
+        # Timers firing on the same frame do so in the order they were scheduled
+        heappush(self.heap, (start + self.getFrames(duration), self.numScheduled, timer))
+        self.numScheduled += 1
+        return timer
+
+    def update(self):
+        self.frame += 1
+        heap = self.heap
+        while len(heap) > 0 and heap[0][0] <= self.frame:
+            timer = heappop(heap)[2]
+            if not timer.cancelled:
+                timer.cancelled = True
+                timer.callback()
+
+    def clear(self):
+        for frame, count, timer in self.heap:
+            timer.cancelled = True
+        self.heap = []
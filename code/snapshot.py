@@ -0,0 +1,25 @@
+from typing import NamedTuple, Optional, Tuple
+
+
+class GameSnapshot(NamedTuple):
+    """
+    Complete simulation state of a GameController, as returned by
+    GameController.snapshot(). Nodes are referenced by their index in
+    NodeGroup.nodeList and entity state is stored as plain tuples (see the
+    getState methods), so snapshots can be copied, compared and pickled.
+    """
+    level: int
+    lives: int
+    score: int
+    ghostsKilled: int
+    killingGhost: Optional[int]
+    levelWon: bool
+    levelLost: bool
+    flashBG: bool
+    pause: Tuple
+    access: Tuple
+    pellets: Tuple
+    pacman: Tuple
+    ghosts: Tuple
+    mainMode: Tuple
+    fruit: Optional[Tuple]
@@ -1,13 +1,14 @@
 import pygame
 from constants import *
-import numpy as np
 from animation import Animator
 
 BASETILEWIDTH = 16
 BASETILEHEIGHT = 16
 DEATH = 5
 
-class Spritesheet(object):
+# The sheet is decoded and scaled once per process, and every cut (and rotated)
+# image is cached, so creating sprites is a dictionary lookup.
+class SpriteAtlas(object):
     def __init__(self):
         self.sheet = pygame.image.load("spritesheet_mspacman.png").convert()
         transcolor = self.sheet.get_at((0,0))
@@ -15,12 +16,37 @@ class Spritesheet(object):
         width = int(self.sheet.get_width() / BASETILEWIDTH * TILEWIDTH)
         height = int(self.sheet.get_height() / BASETILEHEIGHT * TILEHEIGHT)
         self.sheet = pygame.transform.scale(self.sheet, (width, height))
+        self.images = {}
+
+    def getImage(self, x, y, width, height, rotation=0):
+        key = (x, y, width, height, rotation)
+        image = self.images.get(key)
+        if image is None:
+            if rotation == 0:
+                self.sheet.set_clip(pygame.Rect(x*TILEWIDTH, y*TILEHEIGHT, width, height))
+                image = self.sheet.subsurface(self.sheet.get_clip())
+            else:
+                image = pygame.transform.rotate(self.getImage(x, y, width, height), rotation*90)
+            self.images[key] = image
+        return image
+
+
+atlas = None
+
+def getAtlas():
+    global atlas
+    if atlas is None:
+        atlas = SpriteAtlas()
+    return atlas
+
+
+class Spritesheet(object):
+    def __init__(self):
+        self.atlas = getAtlas()
+        self.sheet = self.atlas.sheet
         
-    def getImage(self, x, y, width, height):
-        x *= TILEWIDTH
-        y *= TILEHEIGHT
-        self.sheet.set_clip(pygame.Rect(x, y, width, height))
-        return self.sheet.subsurface(self.sheet.get_clip())
+    def getImage(self, x, y, width, height, rotation=0):
+        return self.atlas.getImage(x, y, width, height, rotation)
 
 
 class PacmanSprites(Spritesheet):
@@ -30,33 +56,26 @@ class PacmanSprites(Spritesheet):
         self.entity.image = self.getStartImage()         
         self.animations = {}
         self.defineAnimations()
-        self.stopimage = (8, 0)
+        self.stopimage = self.stopimages[LEFT]
 
     def defineAnimations(self):
-        self.animations[LEFT] = Animator(((8,0), (0, 0), (0, 2), (0, 0)))
-        self.animations[RIGHT] = Animator(((10,0), (2, 0), (2, 2), (2, 0)))
-        self.animations[UP] = Animator(((10,2), (6, 0), (6, 2), (6, 0)))
-        self.animations[DOWN] = Animator(((8,2), (4, 0), (4, 2), (4, 0)))
-        self.animations[DEATH] = Animator(((0, 12), (2, 12), (4, 12), (6, 12), (8, 12), (10, 12), (12, 12), (14, 12), (16, 12), (18, 12), (20, 12)), speed=6, loop=False)
+        self.animations[LEFT] = Animator(self.getImages((8,0), (0, 0), (0, 2), (0, 0)))
+        self.animations[RIGHT] = Animator(self.getImages((10,0), (2, 0), (2, 2), (2, 0)))
+        self.animations[UP] = Animator(self.getImages((10,2), (6, 0), (6, 2), (6, 0)))
+        self.animations[DOWN] = Animator(self.getImages((8,2), (4, 0), (4, 2), (4, 0)))
+        self.animations[DEATH] = Animator(self.getImages((0, 12), (2, 12), (4, 12), (6, 12), (8, 12), (10, 12), (12, 12), (14, 12), (16, 12), (18, 12), (20, 12)), speed=6, loop=False)
+        self.stopimages = {LEFT:self.getImage(8, 0), RIGHT:self.getImage(10, 0), 
+                           DOWN:self.getImage(8, 2), UP:self.getImage(10, 2)}
 
     def update(self, dt):
         if self.entity.alive == True:
-            if self.entity.direction == LEFT:
-                self.entity.image = self.getImage(*self.animations[LEFT].update(dt))
-                self.stopimage = (8, 0)
-            elif self.entity.direction == RIGHT:
-                self.entity.image = self.getImage(*self.animations[RIGHT].update(dt))
-                self.stopimage = (10, 0)
-            elif self.entity.direction == DOWN:
-                self.entity.image = self.getImage(*self.animations[DOWN].update(dt))
-                self.stopimage = (8, 2)
-            elif self.entity.direction == UP:
-                self.entity.image = self.getImage(*self.animations[UP].update(dt))
-                self.stopimage = (10, 2)
-            elif self.entity.direction == STOP:
-                self.entity.image = self.getImage(*self.stopimage)
+            if self.entity.direction == STOP:
+                self.entity.image = self.stopimage
+            else:
+                self.entity.image = self.animations[self.entity.direction].update(dt)
+                self.stopimage = self.stopimages[self.entity.direction]
         else:
-            self.entity.image = self.getImage(*self.animations[DEATH].update(dt))
+            self.entity.image = self.animations[DEATH].update(dt)
 
     def reset(self):
         for key in list(self.animations.keys()):
@@ -68,6 +87,9 @@ class PacmanSprites(Spritesheet):
     def getImage(self, x, y):
         return Spritesheet.getImage(self, x, y, 2*TILEWIDTH, 2*TILEHEIGHT)
 
+    def getImages(self, *frames):
+        return tuple(self.getImage(x, y) for x, y in frames)
+
 
 class GhostSprites(Spritesheet):
     def __init__(self, entity):
@@ -139,31 +161,24 @@ class LifeSprites(Spritesheet):
 
 
 class MazeSprites(Spritesheet):
-    def __init__(self, mazefile, rotfile):
+    def __init__(self, data, rotdata):
         Spritesheet.__init__(self)
-        self.data = self.readMazeFile(mazefile)
-        self.rotdata = self.readMazeFile(rotfile)
-
-    def getImage(self, x, y):
-        return Spritesheet.getImage(self, x, y, TILEWIDTH, TILEHEIGHT)
+        self.data = data
+        self.rotdata = rotdata
 
-    def readMazeFile(self, mazefile):
-        return np.loadtxt(mazefile, dtype='<U1')
+    def getImage(self, x, y, rotation=0):
+        return Spritesheet.getImage(self, x, y, TILEWIDTH, TILEHEIGHT, rotation)
 
     def constructBackground(self, background, y):
         for row in list(range(self.data.shape[0])):
             for col in list(range(self.data.shape[1])):
                 if self.data[row][col].isdigit():
                     x = int(self.data[row][col]) + 12
-                    sprite = self.getImage(x, y)
                     rotval = int(self.rotdata[row][col])
-                    sprite = self.rotate(sprite, rotval)
+                    sprite = self.getImage(x, y, rotval)
                     background.blit(sprite, (col*TILEWIDTH, row*TILEHEIGHT))
                 elif self.data[row][col] == '=':
                     sprite = self.getImage(10, 8)
                     background.blit(sprite, (col*TILEWIDTH, row*TILEHEIGHT))
 
         return background
-
-    def rotate(self, sprite, value):
-        return pygame.transform.rotate(sprite, value*90)
@@ -1,12 +1,10 @@
 import time
-from typing import List
 from constants import *
-from pacman import Pacman
 from player import Player
 from run import GameController 
 from run import FRAMERATE
-from relative_direction import RelativeDirection
-from state_generation import generateStateString, getPacmanPreviousRelativeDirection
+from environment import PacmanEnvironment
+from state_encoding import qKeyToString
 
 
 class Statistic:
@@ -37,8 +35,9 @@ class Statistic:
         
 
 class State:
-    def __init__(self, p1: Player, isTraining: bool, isBenchmarking: bool):
+    def __init__(self, p1: Player, isTraining: bool, isBenchmarking: bool, macroStep: bool = False):
         self.p1 = p1
+        self.macroStep = macroStep
         self.isEnd = False
         self.finalScore = 0
         self.isTraining = isTraining
@@ -60,6 +59,7 @@ class State:
         startTime = time.perf_counter_ns()
         
         iteration = 0
+        environment = None
         while True:
             iteration += 1    
             if self.isTraining:
@@ -68,96 +68,45 @@ class State:
                     iterationsPerSec = (iteration / (time.perf_counter_ns() - startTime)) * 1_000_000_000
                     print(f"Iterations/second: {iterationsPerSec:.3f}")
                     self.p1.numIterations += 0 if iteration == 0 else 100
-                    self.p1.savePolicy()
-                    for state in self.p1.states_value:
-                        print(f'  {state}: {self.p1.states_value[state]}')
+                    self.p1.checkpointPolicy()
+                    for key, value in self.p1.states_value.items():
+                        print(f'  {qKeyToString(key)}: {value}')
                         
-            skipRender = self.isTraining or self.isBenchmarking
-            game = GameController(skipRender)
-            game.startGame()
-            game.update()
-            pacman = game.pacman
-            numFrames = 0
+            if environment is None:
+                skipRender = self.isTraining or self.isBenchmarking
+                environment = PacmanEnvironment(skipRender, self.macroStep)
+            currentState = environment.reset()
+            valid_directions = environment.validDirections
             self.p1.resetStateHistory()
             isFirstState = True
-            previousState = None
-            previousStateScore = 0
-
-            previousActualDirection = LEFT # Pacman always starts to move left
-            choseReverseOfPreviousActualDirection = False
 
             while True:
 
-                numFrames += 1
-
-                currentState = generateStateString(game, previousActualDirection)
-                isAtNewState = pacman.isAtNode or currentState != previousState
-
-                if isAtNewState:
-
-                    valid_directions = self.getValidRelativeDirections(pacman)
-
-                    if self.isTraining and not isFirstState:
-                        stateScore = game.score
-                        reward = (stateScore - previousStateScore) * 10
-                        if choseReverseOfPreviousActualDirection: 
-                            reward -= 100
-                        self.p1.updateQValueOfLastState(currentState, reward, valid_directions)
-                        previousStateScore = stateScore 
-
-                    if len(valid_directions) > 0:
-                        # Take action
-                        chosenDirection = self.p1.chooseAction(currentState, valid_directions)
-                        game.pacman.learntDirection = chosenDirection.toActualDirection(pacman.direction)
-                        previousRelativeDirection = getPacmanPreviousRelativeDirection(pacman, previousActualDirection)
-                        choseReverseOfPreviousActualDirection = chosenDirection.isOppositeDirection(previousRelativeDirection)
-                        isFirstState = False 
-                    else:
-                        game.pacman.learntDirection = STOP
-                    
-                    previousState = currentState
-
-                previousActualDirection = pacman.direction
-
-                game.update()
-
-                if not pacman.alive:
-
-                    if not isFirstState and self.isTraining:
-                        # Update Q-value of previous state
-                        state = generateStateString(game, previousActualDirection)
-                        reward = -1000
-                        self.p1.updateQValueOfLastState(state, reward, [])
-                    
-                    attemptsRemaining = not game.levelLost
-                    if attemptsRemaining:
-                        game.resetLevel()
-                        previousState = None 
-                        isFirstState = True
-                        self.p1.resetStateHistory()
-                        continue                    
-
-                gameHasEnded = game.levelLost or game.levelWon
-                if gameHasEnded:                
-                    if self.isBenchmarking:
-                        self.reportStatistics(game, game.levelWon, numFrames)        
-                    break
+                if len(valid_directions) > 0:
+                    # Take action
+                    chosenDirection = self.p1.chooseAction(currentState, valid_directions)
+                    isFirstState = False
+                else:
+                    chosenDirection = None
 
-            del game
+                currentState, reward, done, info = environment.step(chosenDirection)
+                valid_directions = info["validDirections"]
 
+                if self.isTraining and not isFirstState and (info["died"] or not done):
+                    self.p1.updateQValueOfLastState(currentState, reward, valid_directions)
 
-    def getValidRelativeDirections(self, pacman: Pacman) -> List[RelativeDirection]:
-        valid_directions = pacman.getValidDirections()
-        if len(valid_directions) == 0: return [ ]
-        
-        valid_relative_directions = [
-            RelativeDirection.fromActualDirection(pacman.direction, actualDirection)
-            for actualDirection in valid_directions    
-        ]
-        assert len(valid_relative_directions) > 0
+                if info["gameOver"]:
+                    if self.isBenchmarking:
+                        self.reportStatistics(environment.game, info["levelWon"], info["numFrames"])
+                    break
+
+                if done:
+                    # Pacman died, but has attempts remaining
+                    currentState = environment.reset()
+                    valid_directions = environment.validDirections
+                    isFirstState = True
+                    self.p1.resetStateHistory()
 
-        return valid_relative_directions
-    
 
     def reportStatistics(self, game: GameController, levelWon: bool, numFrames: int):
         self.numGames += 1
@@ -0,0 +1,108 @@
+# Packs the features of a state into a single integer, and a state and an
+# action into a single Q-table key.
+from typing import Dict, List, Optional
+from relative_direction import RelativeDirection
+
+# Relative directions in the order of their bits, and of the actions of a state
+RELATIVEDIRECTIONS = (RelativeDirection.FORWARD, RelativeDirection.BACKWARD,
+                      RelativeDirection.RIGHT, RelativeDirection.LEFT)
+DIRECTIONINDEX = {direction: i for i, direction in enumerate(RELATIVEDIRECTIONS)}
+NUMACTIONS = len(RELATIVEDIRECTIONS)
+
+# Bits of a state from the lowest: the direction to the closest pellet (3 bits,
+# 0 for None and otherwise 1 + its index), the directions targeted by ghosts
+# and the directions with pellets (a bit per direction), Pacman's previous
+# relative direction (3 bits, like the closest pellet) and whether a ghost is
+# frightened
+CLOSESTPELLETSHIFT = 0
+GHOSTSSHIFT = 3
+PELLETSSHIFT = 7
+PREVIOUSSHIFT = 11
+POWERPELLETSHIFT = 14
+NUMSTATES = 1 << 15
+
+# Saved with binary policies, and increased whenever the features or bits of
+# a state change
+STATEENCODINGVERSION = 1
+
+
+def encodeDirection(direction: Optional[RelativeDirection]) -> int:
+    return 0 if direction is None else DIRECTIONINDEX[direction] + 1
+
+def decodeDirection(code: int) -> Optional[RelativeDirection]:
+    return None if code == 0 else RELATIVEDIRECTIONS[code - 1]
+
+def encodeDirections(directions: Dict[RelativeDirection, bool]) -> int:
+    bits = 0
+    for direction, value in directions.items():
+        if value:
+            bits |= 1 << DIRECTIONINDEX[direction]
+    return bits
+
+def decodeDirections(bits: int) -> Dict[RelativeDirection, bool]:
+    return {direction: bool(bits >> i & 1) for i, direction in enumerate(RELATIVEDIRECTIONS)}
+
+
+def encodeState(hasPowerPellet: bool, previousDirection: Optional[RelativeDirection],
+                ghostTargetedDirections: Dict[RelativeDirection, bool],
+                directionsHasPellets: Dict[RelativeDirection, bool],
+                directionToClosestPellet: Optional[RelativeDirection]) -> int:
+    return (
+        encodeDirection(directionToClosestPellet) << CLOSESTPELLETSHIFT
+        | encodeDirections(ghostTargetedDirections) << GHOSTSSHIFT
+        | encodeDirections(directionsHasPellets) << PELLETSSHIFT
+        | encodeDirection(previousDirection) << PREVIOUSSHIFT
+        | bool(hasPowerPellet) << POWERPELLETSHIFT
+    )
+
+# The features of a state, in the order (and with the str()) of the state
+# strings that were used before states were integers
+def decodeState(state: int) -> List:
+    return [
+        bool(state >> POWERPELLETSHIFT & 1),
+        decodeDirection(state >> PREVIOUSSHIFT & 7),
+        decodeDirections(state >> GHOSTSSHIFT & 15),
+        decodeDirections(state >> PELLETSSHIFT & 15),
+        decodeDirection(state >> CLOSESTPELLETSHIFT & 7),
+    ]
+
+def stateToString(state: int) -> str:
+    return str(decodeState(state))
+
+def isValidState(state: int) -> bool:
+    return (0 <= state < NUMSTATES
+            and state >> PREVIOUSSHIFT & 7 <= NUMACTIONS
+            and state >> CLOSESTPELLETSHIFT & 7 <= NUMACTIONS)
+
+
+def encodeQKey(state: int, action: RelativeDirection) -> int:
+    return state * NUMACTIONS + DIRECTIONINDEX[action]
+
+def decodeQKey(key: int):
+    state, action = divmod(key, NUMACTIONS)
+    return state, RELATIVEDIRECTIONS[action]
+
+def qKeyToString(key: int) -> str:
+    state, action = decodeQKey(key)
+    return str([stateToString(state), action])
+
+
+# Policies saved before states were integers are keyed by str([state, action])
+# of the state strings. They are converted by looking their keys up among the
+# strings of every integer key, and a policy saved for another set of state
+# features (which the current states never matched) can not be converted.
+def convertPolicy(states_value: dict) -> dict:
+    keys = {}
+    converted = type(states_value)()
+    for key, value in states_value.items():
+        if not isinstance(key, str):
+            converted[key] = value
+            continue
+        if len(keys) == 0:
+            keys = {qKeyToString(qKey): qKey
+                    for qKey in range(NUMSTATES * NUMACTIONS) if isValidState(qKey // NUMACTIONS)}
+        qKey = keys.get(key)
+        if qKey is None:
+            raise ValueError(f"Policy key {key} is not in the current state format")
+        converted[qKey] = value
+    return converted
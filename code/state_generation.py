@@ -1,18 +1,28 @@
 # Updates the state with the current game world's information.
 import math
 import sys
-from typing import Iterable, Tuple
+from typing import Iterable
 
-from pygame import Vector2
+from vector import Vector2
 from constants import *
 from nodes import Node
 from pacman import Pacman
-from pellets import Pellet
+from pellets import Pellet, PelletGroup
 from relative_direction import RelativeDirection
 from run import GameController
+from state_encoding import encodeState
+
+
+# The state as a single integer (see state_encoding)
+def generateState(game: GameController, previousActualDirection: int) -> int:
+    return encodeState(*generateStateFeatures(game, previousActualDirection))
 
 
 def generateStateString(game: GameController, previousActualDirection: int) -> str:
+    return str(generateStateFeatures(game, previousActualDirection))
+
+
+def generateStateFeatures(game: GameController, previousActualDirection: int) -> list:
 
     pacman = game.pacman
 
@@ -25,37 +35,28 @@ def generateStateString(game: GameController, previousActualDirection: int) -> s
     if any(directions_has_pellets.values()):
         # Closest pellet is on pacmans edge or the edge of the node that pacman is one,
         # so just find closest to pacmans position
-        direction_to_closest_pellet = directionToClosestPellet(pacman, game.pellets.pelletList)
+        direction_to_closest_pellet = directionToClosestPellet(pacman, game.pellets)
     else:
 
         # No pellet in pacmans edge / adjacent edges, so find direction to
         # neighboring node that is closest to a pellet            
-        neighborNodes: Tuple[int, Node] = []
-        if pacman.isAtNode:
-            for validDirection in pacman.getValidDirections():
-                directionNode = pacman.node.neighbors[validDirection]
-                neighborNodes.append((validDirection, directionNode))   
-        else:
-            neighborNodes.append((pacman.direction, pacman.target))
-            neighborNodes.append((-pacman.direction, pacman.node))
-
         shortestDistance = sys.float_info.max
-        for nodeDirection, node in neighborNodes:
-            closestPellet, closestPelletDistance = getClosestPellet(node.position, game.pellets.pelletList)
+        for nodeDirection, relativeDirection, node in pacman.getView().neighbors:
+            closestPellet, closestPelletDistance = getClosestPellet(node.position, game.pellets)
             closestPelletDistance += pacman.position.manhattanDistanceTo(node.position)
             if closestPelletDistance < shortestDistance:
                 shortestDistance = closestPelletDistance
-                direction_to_closest_pellet = RelativeDirection.fromActualDirection(pacman.direction, nodeDirection)
+                direction_to_closest_pellet = relativeDirection
 
     has_power_pellet = any(ghost.mode.current == FREIGHT for ghost in game.ghosts.ghosts)
 
-    return str([ 
+    return [ 
         has_power_pellet,
         getPacmanPreviousRelativeDirection(game.pacman, previousActualDirection), 
         ghost_targeted_directions, 
         directions_has_pellets, 
         direction_to_closest_pellet
-    ]) 
+    ]
 
 
 def getPacmanPreviousRelativeDirection(pacman: Pacman, previousActualDirection: int):        
@@ -84,9 +85,7 @@ def getGhostTargetedDirections(game: GameController):
     }
     
     if pacman.isAtNode:
-        for validDirection in pacman.getValidDirections():
-            directionNode = pacman.node.neighbors[validDirection]
-            relativeDirection = RelativeDirection.fromActualDirection(pacman.direction, validDirection)
+        for validDirection, relativeDirection, directionNode in pacman.getView().neighbors:
             ghost_targeted_directions[relativeDirection] = (
                 isGhostTargetingNodeNotFromNode(pacman.node, directionNode) 
                 or 
@@ -120,7 +119,7 @@ def getGhostTargetedDirections(game: GameController):
     return ghost_targeted_directions
 
 
-def directionToClosestPellet(pacman: Pacman, pellets: Iterable[Pellet]):
+def directionToClosestPellet(pacman: Pacman, pellets: PelletGroup):
     closestPellet, closestPelletDistance = getClosestPellet(pacman.position, pellets)
     if closestPellet == None:
         # This should only happen when game is done
@@ -144,21 +143,13 @@ def directionToClosestPellet(pacman: Pacman, pellets: Iterable[Pellet]):
     return RelativeDirection.FORWARD
     
 
-def getClosestPellet(position: Vector2, pellets: Iterable[Pellet]):
-    closestPelletDistance = sys.float_info.max
-    closestPellet: Pellet = None
-    for pellet in pellets:    
-        distance = position.manhattanDistanceTo(pellet.position)
-        if distance < closestPelletDistance:
-            closestPellet = pellet
-            closestPelletDistance = distance
-
-    return closestPellet, closestPelletDistance
+def getClosestPellet(position: Vector2, pellets: PelletGroup):
+    return pellets.getClosestPellet(position)
 
 
 def getDirectionsPelletState(game: GameController):
     pacman = game.pacman
-    pellets = game.pellets.pelletList
+    pellets = game.pellets
 
     directions_has_pellets = {
         RelativeDirection.FORWARD: False,
@@ -167,22 +158,38 @@ def getDirectionsPelletState(game: GameController):
         RelativeDirection.LEFT: False,
     }
     
+    # Edges of compiled mazes are answered from the pellet counters of the
+    # PelletGroup, and anything else by scanning the remaining pellets
     if pacman.isAtNode:
-        for validDirection in pacman.getValidDirections():
-            directionNode = pacman.node.neighbors[validDirection]
-            relativeDirection = RelativeDirection.fromActualDirection(pacman.direction, validDirection)
-            directions_has_pellets[relativeDirection] = edgeHasPellet(pacman.node.position, directionNode.position, pellets)
+        for validDirection, relativeDirection, directionNode in pacman.getView().neighbors:
+            edge = pacman.node.edges.get(directionNode)
+            if edge is not None:
+                directions_has_pellets[relativeDirection] = pellets.edgeHasPellet(edge[0])
+            else:
+                directions_has_pellets[relativeDirection] = edgeHasPellet(
+                    pacman.node.position, directionNode.position, pellets.getRemainingPellets())
     else:
+        edge = pacman.node.edges.get(pacman.target)
+        if edge is not None:
+            edgeId, nodeIsFirst = edge
+            directions_has_pellets[RelativeDirection.FORWARD] = (
+                pellets.partialEdgeHasPellet(edgeId, pacman.position, nodeIsFirst)
+            )
+            directions_has_pellets[RelativeDirection.BACKWARD] = (
+                pellets.partialEdgeHasPellet(edgeId, pacman.position, not nodeIsFirst)
+            )
+        else:
+            remaining = pellets.getRemainingPellets()
 
-        # Check if forward has pellets
-        directions_has_pellets[RelativeDirection.FORWARD] = (
-                edgeHasPellet(pacman.position, pacman.target.position, pellets)
-        )
+            # Check if forward has pellets
+            directions_has_pellets[RelativeDirection.FORWARD] = (
+                    edgeHasPellet(pacman.position, pacman.target.position, remaining)
+            )
 
-        # Check if backward has pellets
-        directions_has_pellets[RelativeDirection.BACKWARD] = (
-                edgeHasPellet(pacman.position, pacman.node.position, pellets)
-        )
+            # Check if backward has pellets
+            directions_has_pellets[RelativeDirection.BACKWARD] = (
+                    edgeHasPellet(pacman.position, pacman.node.position, remaining)
+            )
 
     return directions_has_pellets
 
@@ -0,0 +1,80 @@
+import random
+import sys
+
+import numpy as np
+
+import entity
+from constants import *
+from run import GameController
+from batchgame import BatchGame, ENTITYNAMES
+
+
+# Plays a BatchGame of one game and a GameController with the same seed and
+# moves, continuing after deaths and finished games like PacmanEnvironment,
+# and checks that they are in the same state after every frame. Frightened
+# ghosts of the GameController choose their random directions from the
+# numbers the batch draws (Entity.randomDirection would draw from the random
+# module), so the games still agree after the first random choice. Returns
+# the number of finished games, deaths and ghosts killed.
+def checkBatchGame(numFrames=20000, seed=1):
+    batch = BatchGame(1, seed=seed)
+    game = GameController()
+    game.startGame()
+    moves = random.Random(seed)
+    numbers = np.random.default_rng(seed)
+    randint = entity.randint
+    entity.randint = lambda a, b: int(numbers.random() * (b + 1))
+
+    numGames = numDeaths = numGhostsKilled = 0
+    learntDirection = STOP
+    try:
+        for frame in range(numFrames):
+            if moves.random() < 0.15:
+                learntDirection = moves.choice((UP, DOWN, LEFT, RIGHT))
+            game.pacman.learntDirection = learntDirection
+            score = game.score
+            game.update()
+            scoreGained = game.score - score
+            died = not game.pacman.alive
+            if died and not game.levelLost:
+                game.resetLevel()
+            done = game.levelLost or game.levelWon
+            final = (game.score, game.lives, game.pellets.numEaten, game.ghostsKilled, game.levelWon)
+            if done:
+                game.resetEpisode()
+
+            batchScoreGained, batchDied, batchDone = batch.step(np.array([learntDirection]))
+            assert (batchScoreGained[0], batchDied[0], batchDone[0]) == (scoreGained, died, done), frame
+            if done:
+                batchFinal = (batch.finalScore[0], batch.finalLives[0], batch.finalNumEaten[0],
+                              batch.finalGhostsKilled[0], batch.finalLevelWon[0])
+                assert batchFinal == final, (frame, batchFinal, final)
+                numGames += 1
+                numGhostsKilled += final[3]
+            numDeaths += died
+
+            for e, character in enumerate([game.pacman] + game.ghosts.ghosts):
+                expected = (character.position.x, character.position.y, character.direction, character.speed)
+                actual = (batch.positionX[e, 0], batch.positionY[e, 0], batch.direction[e, 0], batch.speed[e, 0])
+                assert actual == expected, (frame, ENTITYNAMES[e], actual, expected)
+            for i, ghost in enumerate(game.ghosts):
+                assert batch.mode[i, 0] == ghost.mode.current, (frame, i)
+            assert (batch.score[0], batch.lives[0], batch.numEaten[0]) == (
+                game.score, game.lives, game.pellets.numEaten), frame
+            assert batch.fruitActive[0] == (game.fruit is not None), frame
+    finally:
+        entity.randint = randint
+    return numGames, numDeaths, numGhostsKilled
+
+
+def test_batchgame():
+    numGames, numDeaths, numGhostsKilled = checkBatchGame()
+    assert numGames > 0 and numDeaths > 0 and numGhostsKilled > 0, (numGames, numDeaths, numGhostsKilled)
+
+
+if __name__ == "__main__":
+    numFrames = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    numGames, numDeaths, numGhostsKilled = checkBatchGame(numFrames, seed)
+    print(f"Games: {numGames}, deaths: {numDeaths}, ghosts killed: {numGhostsKilled}")
+    print("BatchGame and GameController match")
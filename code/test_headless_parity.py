@@ -0,0 +1,126 @@
+import os
+import random
+import sys
+
+# The rendered game runs without a window or sound
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from constants import *
+from run import GameController, FRAMERATE
+from renderer import RenderedGameController
+
+# Regular pellets left in each level (with a power pellet), so levels are
+# won within a few lives of random moves
+NUMPELLETS = 6
+
+
+# Clock of the rendered game which always ticks a whole frame, like the
+# headless game
+class FixedClock(object):
+    def tick(self, framerate=0):
+        return 1000 / FRAMERATE
+
+
+# Plays a game with its own sequence of random numbers (ghosts in FREIGHT
+# choose random directions), so the two games can be updated in turn
+class ParityGame(object):
+    def __init__(self, game, seed):
+        self.game = game
+        self.pellets = None
+        random.seed(seed)
+        game.startGame()
+        self.randomState = random.getstate()
+        self.trimPellets()
+
+    def update(self):
+        random.setstate(self.randomState)
+        self.game.update()
+        self.randomState = random.getstate()
+        self.trimPellets()
+
+    # Removes every pellet of a new level but the regular pellets and the
+    # power pellet closest to Pacman
+    def trimPellets(self):
+        pellets = self.game.pellets
+        if pellets is self.pellets:
+            return
+        self.pellets = pellets
+        start = self.game.pacman.position
+        distance = lambda pellet: (pellet.position - start).magnitudeSquared()
+        regular = sorted((pellet for pellet in pellets.allPellets if pellet.name == PELLET), key=distance)
+        power = sorted((pellet for pellet in pellets.allPellets if pellet.name == POWERPELLET), key=distance)
+        for pellet in regular[NUMPELLETS:] + power[1:]:
+            pellets.removePellet(pellet)
+
+    # The player resumes the game when it waits for them (after READY)
+    def resume(self):
+        pause = self.game.pause
+        if pause.paused and pause.pauseTime is None:
+            pause.paused = False
+
+    def values(self):
+        return (self.game.score, self.game.lives, self.game.pellets.numEaten, self.game.level)
+
+
+# Plays the headless and the rendered game with the same seed and moves, and
+# checks that they have the same score, lives and eaten pellets on every
+# frame. The headless game is updated on the frames the rendered game is not
+# paused, and takes the death, game over and level transitions (like
+# Environment does) on the frame the pause of the rendered game ends. Returns
+# the number of frames spent in each kind of rendered pause.
+def checkParity(numFrames=20000, seed=7):
+    rendered = ParityGame(RenderedGameController(), seed)
+    rendered.game.clock = FixedClock()
+    headless = ParityGame(GameController(), seed)
+    moves = random.Random(seed)
+    pauses = {"death": 0, "gameOver": 0, "ghostEaten": 0, "levelWon": 0}
+
+    for frame in range(numFrames):
+        rendered.resume()
+        game = rendered.game
+        simulated = not game.pause.paused and game.pacman.alive
+        if simulated and moves.random() < 0.2:
+            direction = moves.choice((UP, DOWN, LEFT, RIGHT))
+            game.pacman.learntDirection = direction
+            headless.game.pacman.learntDirection = direction
+
+        rendered.update()
+        if simulated:
+            assert not headless.game.pause.paused, f"Headless game is paused on frame {frame}"
+            headless.update()
+        elif game.pause.pauseTime is not None:
+            if game.levelWon:
+                pauses["levelWon"] += 1
+            elif game.lives <= 0:
+                pauses["gameOver"] += 1
+            elif not game.pacman.alive:
+                pauses["death"] += 1
+            else:
+                pauses["ghostEaten"] += 1
+
+        if game.pause.pauseTime is None:
+            if headless.game.levelWon:
+                headless.game.nextLevel()
+            elif headless.game.levelLost:
+                headless.game.restartGame()
+            elif not headless.game.pacman.alive:
+                headless.game.resetLevel()
+            headless.trimPellets()
+
+        assert headless.values() == rendered.values(), (
+            f"Frame {frame}: headless (score, lives, pellets, level) {headless.values()} "
+            f"!= rendered {rendered.values()}")
+    return pauses
+
+
+def test_headless_parity():
+    pauses = checkParity()
+    assert all(count > 0 for count in pauses.values()), f"Not every pause was played: {pauses}"
+
+
+if __name__ == "__main__":
+    numFrames = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+    print(f"Paused frames: {checkParity(numFrames, seed)}")
+    print("Headless and rendered games match")
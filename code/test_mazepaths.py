@@ -0,0 +1,78 @@
+import heapq
+import math
+import sys
+
+from constants import *
+from mazedata import MazeData
+from mazecompiler import getCompiledMaze
+from mazepaths import getMazePaths
+from nodes import NodeGroup
+
+
+# Shortest path lengths from the node to every node, by Dijkstra over the
+# Node objects (with their access rules), continuing from the pair of a
+# portal node at no cost like entities do
+def getDistancesFrom(nodes, source, name):
+    distances = [math.inf] * len(nodes.nodeList)
+    distances[source] = 0
+    queue = [(0, source)]
+    while queue:
+        distance, i = heapq.heappop(queue)
+        if distance > distances[i]:
+            continue
+        node = nodes.getNodeFromId(i)
+        for direction in node.getValidDirections(name):
+            neighbor = node.neighbors[direction]
+            length = distance + node.getEdgeTo(neighbor)[1]
+            if neighbor.neighbors[PORTAL] is not None:
+                neighbor = neighbor.neighbors[PORTAL]
+            if length < distances[neighbor.id]:
+                distances[neighbor.id] = length
+                heapq.heappush(queue, (length, neighbor.id))
+    return distances
+
+
+# Checks the paths of the entity against Dijkstra, and that every path
+# leaves its nodes in directions the entity may take
+def checkMazePaths(level, name):
+    mazedata = MazeData()
+    mazedata.loadMaze(level)
+    maze = getCompiledMaze(mazedata.obj)
+    nodes = NodeGroup.fromCompiledMaze(maze)
+    paths = getMazePaths(maze, name)
+    assert getMazePaths(maze, name) is paths
+
+    for source in range(len(nodes.nodeList)):
+        distances = getDistancesFrom(nodes, source, name)
+        for target, distance in enumerate(distances):
+            assert paths.getDistance(source, target) == distance, (level, name, source, target)
+            path = paths.getPath(source, target)
+            if distance == math.inf:
+                assert path is None
+                continue
+            assert path[0] == source and path[-1] == target
+            if source != target:
+                direction = paths.getNextDirection(source, target)
+                assert direction in nodes.getNodeFromId(source).getValidDirections(name)
+
+
+def test_mazepaths():
+    for level in (0, 1):
+        for name in (PACMAN, BLINKY):
+            checkMazePaths(level, name)
+
+
+# Prints the shortest path of Pacman between two nodes, given as tiles
+if __name__ == "__main__":
+
+    assert len(sys.argv) == 5, "Usage: test_mazepaths.py COL ROW COL ROW"
+
+    mazedata = MazeData()
+    mazedata.loadMaze(0)
+    maze = getCompiledMaze(mazedata.obj)
+    nodes = NodeGroup.fromCompiledMaze(maze)
+    source, target = (nodes.getNodeFromTiles(int(col), int(row)).id
+                      for col, row in (sys.argv[1:3], sys.argv[3:5]))
+    paths = getMazePaths(maze)
+    print(f"Distance: {paths.getDistance(source, target)}")
+    print(f"Path: {[nodes.nodeKeys[i] for i in paths.getPath(source, target) or []]}")
@@ -1,4 +1,5 @@
 import pygame
+from functools import partial
 from vector import Vector2
 from constants import *
 
@@ -10,39 +11,46 @@ class Text(object):
         self.size = size
         self.visible = visible
         self.position = Vector2(x, y)
-        self.timer = 0
         self.lifespan = time
         self.label = None
-        self.destroy = False
         self.setupFont("PressStart2P-Regular.ttf")
-        self.createLabel()
 
     def setupFont(self, fontpath):
-        self.font = pygame.font.Font(fontpath, self.size)
+        self.font = getFont(fontpath, self.size)
 
     def createLabel(self):
         self.label = self.font.render(self.text, 1, self.color)
 
+    # The label is only rendered again when the text is drawn, so changing
+    # the text (such as the score on every pellet) costs nothing per frame
     def setText(self, newtext):
-        self.text = str(newtext)
-        self.createLabel()
-
-    def update(self, dt):
-        if self.lifespan is not None:
-            self.timer += dt
-            if self.timer >= self.lifespan:
-                self.timer = 0
-                self.lifespan = None
-                self.destroy = True
+        newtext = str(newtext)
+        if newtext != self.text:
+            self.text = newtext
+            self.label = None
 
     def render(self, screen):
         if self.visible:
+            if self.label is None:
+                self.createLabel()
             x, y = self.position.asTuple()
             screen.blit(self.label, (x, y))
 
 
+fonts = {}
+
+# Fonts are loaded once per file and size, instead of once per text
+def getFont(fontpath, size):
+    font = fonts.get((fontpath, size))
+    if font is None:
+        font = fonts[(fontpath, size)] = pygame.font.Font(fontpath, size)
+    return font
+
+
+# Texts with a lifespan are removed by a timer of the scheduler
 class TextGroup(object):
-    def __init__(self):
+    def __init__(self, timers):
+        self.timers = timers
         self.nextid = 10
         self.alltext = {}
         self.setupText()
@@ -51,6 +59,8 @@ class TextGroup(object):
     def addText(self, text, color, x, y, size, time=None, id=None):
         self.nextid += 1
         self.alltext[self.nextid] = Text(text, color, x, y, size, time=time, id=id)
+        if time is not None:
+            self.timers.schedule(time, partial(self.removeText, self.nextid))
         return self.nextid
 
     def removeText(self, id):
@@ -66,12 +76,6 @@ class TextGroup(object):
         self.addText("SCORE", WHITE, 0, 0, size)
         self.addText("LEVEL", WHITE, 23*TILEWIDTH, 0, size)
 
-    def update(self, dt):
-        for tkey in list(self.alltext.keys()):
-            self.alltext[tkey].update(dt)
-            if self.alltext[tkey].destroy:
-                self.removeText(tkey)
-
     def showText(self, id):
         self.hideText()
         self.alltext[id].visible = True
@@ -22,11 +22,15 @@ if __name__ == "__main__":
     # number of iterations that will be carried out in a sequence of connected actions.    
     WALK_LENGTH = 0.2
 
+    # Checkpoints in a row (after a full one) that only log the changed Q-values
+    CHECKPOINT_DELTAS = 0
+
     print("Starting training")
     print("Policy file:")
 
     policy_name = f"policies/temp/policy-{datetime.now().strftime('%y-%m-%d-%H-%M-%S-%f')}"
     print("Policy file: " + policy_name)
-    player = Player("Player", policy_name, EXPLORATION_RATE, LEARNING_RATE, DISCOUNT_RATE, WALK_LENGTH)
+    player = Player("Player", policy_name, EXPLORATION_RATE, LEARNING_RATE, DISCOUNT_RATE, WALK_LENGTH,
+                    checkpointDeltas=CHECKPOINT_DELTAS)
     state = State(player, True, False)
     state.play()
\ No newline at end of file
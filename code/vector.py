@@ -2,10 +2,12 @@ import math
 from typing import Self
 
 class Vector2(object):
+    __slots__ = ("x", "y")
+    thresh = 0.000001
+
     def __init__(self, x=0, y=0):
         self.x = x
         self.y = y
-        self.thresh = 0.000001
 
     def __add__(self, other):
         return Vector2(self.x + other.x, self.y + other.y)
@@ -33,14 +35,23 @@ class Vector2(object):
                 return True
         return False
 
+    def set(self, x, y):
+        self.x = x
+        self.y = y
+
     def magnitudeSquared(self):
         return self.x**2 + self.y**2
 
     def magnitude(self):
         return math.sqrt(self.magnitudeSquared())
     
+    def distanceSquaredTo(self, other: Self):
+        x = self.x - other.x
+        y = self.y - other.y
+        return x**2 + y**2
+
     def distanceTo(self, other: Self):
-        return (other - self).magnitude()
+        return math.sqrt(self.distanceSquaredTo(other))
     
     def manhattanDistanceTo(self, other: Self):
         return abs(self.x - other.x) + abs(self.y - other.y);